@@ -3,12 +3,9 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 # Mock user database (replace with real database)
@@ -41,6 +38,8 @@ def get_password_hash(password):
     return password
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
+    
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -87,6 +86,8 @@ async def login(user: UserLogin):
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(token: str = Depends(oauth2_scheme)):
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         email: str = payload.get("sub")
@@ -98,8 +99,24 @@ async def refresh_token(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_token_subject(token: str = Depends(oauth2_scheme)) -> str:
+    """Subject of a valid access token; 401 for a missing, forged or expired one"""
+    from jose import JWTError, jwt
+    
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    subject = payload.get("sub")
+    if not subject:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return subject
+
 @router.get("/me", response_model=User)
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         email: str = payload.get("sub")
@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
-from pathlib import Path
-from app.api.auth import oauth2_scheme
+from app.api.auth import get_token_subject, oauth2_scheme
 from app.core.config import settings
-import openai
+from app.services.chat_store import chat_store
+from app.services.rate_limiter import get_request_identity, llm_limiter, rate_limit, rate_limiter
+from app.services.file_index import file_index
+from app.services.single_flight import chat_flight, make_key
+from app.services.storage import get_storage
+from app.services.intent_router import Route, intent_router
 
 router = APIRouter()
 
-# Mock chat history database
-chat_history = {}
-
 class ChatMessage(BaseModel):
     content: str
     file_context: Optional[List[str]] = None
@@ -26,164 +28,139 @@ class ChatHistoryResponse(BaseModel):
     messages: List[ChatResponse]
 
 @router.get("/files")
-async def get_available_files():
-    """Get list of available files for analysis"""
-    from app.api.files import files_db
-    return {"files": list(files_db.keys())}
+async def get_available_files(
+    limit: int = Query(settings.FILES_PAGE_DEFAULT_LIMIT, ge=1, le=settings.FILES_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
+    """Get one page of file IDs available for analysis, newest first"""
+    from app.api.files import get_files_db
+    
+    await get_files_db()  # builds the index on first use
+    file_ids, next_cursor = file_index.query(limit=limit, cursor=cursor)
+    return {"files": file_ids, "next_cursor": next_cursor}
 
 @router.get("/files/{file_id}/content")
 async def get_file_content(file_id: str):
     """Get file content for AI analysis"""
-    from app.api.files import load_files_db
-    from pathlib import Path
-    from app.core.config import settings
+    from app.api.files import get_files_db
     
-    files_db = load_files_db()
+    files_db = await get_files_db()
     if file_id not in files_db:
         raise HTTPException(status_code=404, detail="File not found")
     
     file_info = files_db[file_id]
-    file_path = Path(settings.UPLOAD_DIR) / file_id
     
     try:
         if file_info["type"].startswith("text/"):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = await get_storage().read_text(file_id)
             return {"content": content, "filename": file_info["name"]}
         else:
             return {"content": f"Файл {file_info['name']} (тип: {file_info['type']}) - содержимое недоступно для анализа", "filename": file_info["name"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка чтения файла: {str(e)}")
 
-@router.post("/message", response_model=ChatResponse)
-async def send_message(message: ChatMessage):
-    """Send a message to the AI chat"""
+async def _ask_providers(message: ChatMessage, route: Route) -> str:
+    """Ask OpenRouter, then OpenAI; returns an empty string if both fail"""
+    try:
+        import openai
+    except ImportError as e:
+        # Without the SDK the canned fallback answers are used
+        print(f"openai SDK unavailable: {e}")
+        return ""
     
-    # Always provide a response - use enhanced fallback system
     ai_response = ""
     
-    try:
-        # Try OpenRouter first (free)
+    # Admission control: bounded number of concurrent provider calls
+    async with llm_limiter.slot():
         try:
-            client = openai.OpenAI(
-                api_key=settings.OPENROUTER_API_KEY,
-                base_url=settings.OPENROUTER_BASE_URL,
-                default_headers={
-                    "HTTP-Referer": "https://biospacesearch.com",
-                    "X-Title": "BioSpaceSearch AI Platform"
-                }
-            )
-            
-            # Prepare context
-            context = "You are an AI assistant for BioSpaceSearch AI Platform. You help users analyze space research documents, answer questions about space exploration, and provide insights about NASA missions and space technology. Respond in Russian when the user writes in Russian."
-            
-            # Add available files info to context
+            # Try OpenRouter first (free)
             try:
-                from app.api.files import load_files_db
-                files_db = load_files_db()  # Reload from file
-                print(f"Loaded files_db: {files_db}")
-                if files_db:
-                    file_list = [f"{file_info['name']} (ID: {file_id})" for file_id, file_info in files_db.items()]
-                    context += f"\n\nДоступные файлы на сервере: {', '.join(file_list)}"
-                    print(f"Added file list to context: {file_list}")
-                else:
-                    print("files_db is empty")
-            except Exception as e:
-                print(f"Error loading files_db: {e}")
-            
-            # Check if user is asking about files
-            file_content = ""
-            content_lower = message.content.lower()
-            print(f"User message: {message.content}")
-            print(f"Looking for file keywords in: {content_lower}")
-            
-            if any(word in content_lower for word in ['файл', 'документ', 'анализ', 'содержимое', 'что написано', 'сатурн', 'space_research']):
-                print("File keywords detected, looking for files...")
-                # Get available files (already imported above)
-                print(f"Available files: {list(files_db.keys()) if files_db else 'None'}")
+                if not await rate_limiter.allow_provider("openrouter"):
+                    raise RuntimeError("OpenRouter rate limit reached")
                 
-                if files_db:
-                    # Try to find relevant file based on keywords
-                    relevant_file_id = None
-                    
-                    # Look for specific file mentions
-                    if 'сатурн' in content_lower:
-                        print("Looking for Saturn file...")
-                        for file_id, file_info in files_db.items():
-                            print(f"Checking file: {file_info['name']}")
-                            if 'saturn' in file_info['name'].lower():
-                                relevant_file_id = file_id
-                                print(f"Found Saturn file: {file_id}")
-                                break
-                    elif 'space_research' in content_lower or 'space research' in content_lower:
-                        print("Looking for space research file...")
-                        for file_id, file_info in files_db.items():
-                            if 'space_research' in file_info['name'].lower():
-                                relevant_file_id = file_id
-                                print(f"Found space research file: {file_id}")
-                                break
-                    
-                    # If no specific file found, use the first available
-                    if not relevant_file_id:
-                        relevant_file_id = list(files_db.keys())[0]
-                        print(f"Using first available file: {relevant_file_id}")
-                    
+                client = openai.OpenAI(
+                    api_key=settings.OPENROUTER_API_KEY,
+                    base_url=settings.OPENROUTER_BASE_URL,
+                    default_headers={
+                        "HTTP-Referer": "https://biospacesearch.com",
+                        "X-Title": "BioSpaceSearch AI Platform"
+                    }
+                )
+                
+                # Prepare context
+                context = "You are an AI assistant for BioSpaceSearch AI Platform. You help users analyze space research documents, answer questions about space exploration, and provide insights about NASA missions and space technology. Respond in Russian when the user writes in Russian."
+                
+                # General questions skip the catalog and file retrieval entirely
+                files_db = {}
+                if route.needs_files:
                     try:
-                        file_info = files_db[relevant_file_id]
-                        file_path = Path(settings.UPLOAD_DIR) / relevant_file_id
-                        print(f"Reading file: {file_path}")
-                        if file_info["type"].startswith("text/") and file_path.exists():
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                file_content = f.read()
-                            context += f"\n\nДоступен файл для анализа: {file_info['name']}\nСодержимое файла:\n{file_content[:3000]}..."
-                            print(f"Successfully added file content from {file_info['name']} to context")
+                        from app.api.files import get_files_db
+                        files_db = await get_files_db()
+                        if files_db:
+                            file_list = [f"{file_info['name']} (ID: {file_id})" for file_id, file_info in files_db.items()]
+                            context += f"\n\nДоступные файлы на сервере: {', '.join(file_list)}"
+                            print(f"Added {len(file_list)} files to context")
                         else:
-                            print(f"File not found or not text: {file_path}")
+                            print("files_db is empty")
                     except Exception as e:
-                        print(f"Error reading file: {e}")
+                        print(f"Error loading files_db: {e}")
                 else:
-                    print("No files available in database")
-            
-            if message.file_context:
-                context += f" The user has mentioned {len(message.file_context)} files in their query."
-            
-            # Call OpenRouter API
-            completion = client.chat.completions.create(
-                model=settings.OPENROUTER_MODEL,
-                messages=[
-                    {"role": "system", "content": context},
-                    {"role": "user", "content": message.content}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            ai_response = completion.choices[0].message.content
-            print(f"OpenRouter response: '{ai_response}'")
-            
-            # Check if response is empty or too short
-            if not ai_response or len(ai_response.strip()) < 3:
-                print("OpenRouter returned empty response, using fallback")
-                ai_response = ""  # Will trigger fallback below
-            
-        except Exception as openrouter_error:
-            print(f"OpenRouter API error: {openrouter_error}")
-            ai_response = ""  # Will trigger fallback below
-        
-        # If OpenRouter failed or returned empty, try OpenAI
-        if not ai_response or len(ai_response.strip()) < 3:
-            try:
-                client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+                    print(f"Intent '{route.intent}' needs no files, skipping retrieval")
                 
-                # Prepare context
-                context = "You are an AI assistant for BioSpaceSearch AI Platform. You help users analyze space research documents, answer questions about space exploration, and provide insights about NASA missions and space technology."
+                # Files tagged with the themes of the question are retrieval candidates
+                themes = route.themes
+                tagged_file_id = file_index.best_tagged(themes) if themes else None
+                
+                if tagged_file_id or route.mentions_files:
+                    print(f"File retrieval for intent '{route.intent}', themes {themes}, hints {route.file_hints}")
+                    
+                    if files_db:
+                        # Try to find relevant file based on keywords
+                        relevant_file_id = None
+                        
+                        # Look for specific file mentions
+                        for hint in route.file_hints:
+                            relevant_file_id = next(
+                                (file_id for file_id, file_info in files_db.items() if hint in file_info['name'].lower()),
+                                None
+                            )
+                            if relevant_file_id:
+                                print(f"Found file matching '{hint}': {relevant_file_id}")
+                                break
+                        
+                        # Otherwise prefer the file sharing the most themes with the question
+                        if not relevant_file_id and tagged_file_id:
+                            relevant_file_id = tagged_file_id
+                            print(f"Using file tagged {themes}: {relevant_file_id}")
+                        
+                        # If no specific file found, use the first available
+                        if not relevant_file_id:
+                            relevant_file_id = list(files_db.keys())[0]
+                            print(f"Using first available file: {relevant_file_id}")
+                        
+                        try:
+                            file_info = files_db[relevant_file_id]
+                            storage = get_storage()
+                            print(f"Reading file: {relevant_file_id}")
+                            if file_info["type"].startswith("text/") and await storage.exists(relevant_file_id):
+                                # Only the first 3000 characters go into the prompt
+                                file_content = await storage.read_text(relevant_file_id, limit=3000 * 4)
+                                context += f"\n\nДоступен файл для анализа: {file_info['name']}\nСодержимое файла:\n{file_content[:3000]}..."
+                                print(f"Successfully added file content from {file_info['name']} to context")
+                            else:
+                                print(f"File not found or not text: {relevant_file_id}")
+                        except Exception as e:
+                            print(f"Error reading file: {e}")
+                    else:
+                        print("No files available in database")
                 
                 if message.file_context:
                     context += f" The user has mentioned {len(message.file_context)} files in their query."
                 
-                # Call OpenAI API
-                completion = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
+                # Call OpenRouter API
+                completion = await run_in_threadpool(
+                    client.chat.completions.create,
+                    model=settings.OPENROUTER_MODEL,
                     messages=[
                         {"role": "system", "content": context},
                         {"role": "user", "content": message.content}
@@ -193,41 +170,88 @@ async def send_message(message: ChatMessage):
                 )
                 
                 ai_response = completion.choices[0].message.content
-                print(f"OpenAI response: '{ai_response}'")
+                print(f"OpenRouter response: '{ai_response}'")
                 
-            except Exception as openai_error:
-                print(f"OpenAI API error: {openai_error}")
+                # Check if response is empty or too short
+                if not ai_response or len(ai_response.strip()) < 3:
+                    print("OpenRouter returned empty response, using fallback")
+                    ai_response = ""  # Will trigger fallback below
+                
+            except Exception as openrouter_error:
+                print(f"OpenRouter API error: {openrouter_error}")
                 ai_response = ""  # Will trigger fallback below
-        
-    except Exception as e:
-        print(f"All AI APIs failed: {e}")
-        ai_response = ""  # Will trigger fallback below
+            
+            # If OpenRouter failed or returned empty, try OpenAI
+            if not ai_response or len(ai_response.strip()) < 3:
+                try:
+                    if not await rate_limiter.allow_provider("openai"):
+                        raise RuntimeError("OpenAI rate limit reached")
+                    
+                    client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+                    
+                    # Prepare context
+                    context = "You are an AI assistant for BioSpaceSearch AI Platform. You help users analyze space research documents, answer questions about space exploration, and provide insights about NASA missions and space technology."
+                    
+                    if message.file_context:
+                        context += f" The user has mentioned {len(message.file_context)} files in their query."
+                    
+                    # Call OpenAI API
+                    completion = await run_in_threadpool(
+                        client.chat.completions.create,
+                        model="gpt-3.5-turbo",
+                        messages=[
+                            {"role": "system", "content": context},
+                            {"role": "user", "content": message.content}
+                        ],
+                        max_tokens=500,
+                        temperature=0.7
+                    )
+                    
+                    ai_response = completion.choices[0].message.content
+                    print(f"OpenAI response: '{ai_response}'")
+                    
+                except Exception as openai_error:
+                    print(f"OpenAI API error: {openai_error}")
+                    ai_response = ""  # Will trigger fallback below
+            
+        except Exception as e:
+            print(f"All AI APIs failed: {e}")
+            ai_response = ""  # Will trigger fallback below
+    
+    return ai_response
+
+@router.post("/message", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
+async def send_message(message: ChatMessage, request: Request):
+    """Send a message to the AI chat"""
+    
+    # Identical concurrent questions share one upstream call
+    flight_key = make_key("chat", message.content, *sorted(message.file_context or []))
+    route = intent_router.classify(message.content)
+    ai_response = await chat_flight.do(flight_key, lambda: _ask_providers(message, route))
     
     # If all APIs failed or returned empty, use enhanced fallback
     if not ai_response or len(ai_response.strip()) < 3:
         print("Using enhanced fallback responses")
         import random
         
-        # Enhanced analysis of the question content for more relevant responses
-        content_lower = message.content.lower()
-        
+        # The intent was classified once, before any provider call
         # Check for document analysis requests
-        if any(word in content_lower for word in ['расскажи', 'что написано', 'документ', 'файл', 'анализ', 'содержимое']):
+        if route.intent == "document":
             ai_response = f"Отличный вопрос о содержимом документа! Я проанализировал загруженные файлы и вот что обнаружил:\n\n📊 **Основные темы документа:**\n• Исследования экзопланет с данными о 5000+ подтвержденных планет\n• Исследование Марса с открытиями ровера Perseverance\n• Лунные исследования программы Artemis\n• Астероидные миссии OSIRIS-REx\n• Звездные исследования телескопа Джеймса Уэбба\n\n🔬 **Ключевые открытия:**\n• Органические молекулы на Марсе\n• Водяной лед в лунных кратерах\n• Углеродсодержащие образцы с астероида Бенну\n• Звездообразование 13,5 млрд лет назад\n\nХотите, чтобы я углубился в какую-то конкретную тему?"
         
-        elif any(word in content_lower for word in ['compare', 'comparison', 'difference', 'vs', 'versus', 'сравни', 'сравнение']):
+        elif route.intent == "compare":
             ai_response = f"Отличный вопрос о сравнении '{message.content}'! В космических исследованиях сравнительный анализ крайне важен. Вот что я обнаружил:\n\n🔄 **Методология сравнения:**\n• Анализ технических характеристик\n• Оценка научной ценности\n• Сравнение ресурсных требований\n• Анализ рисков и ограничений\n\n📈 **Ключевые факторы:**\n• Эффективность миссии\n• Стоимость реализации\n• Временные рамки\n• Научная значимость\n\nХотите, чтобы я провел детальное сравнение по конкретным критериям?"
         
-        elif any(word in content_lower for word in ['analyze', 'analysis', 'examine', 'study', 'анализ', 'исследование']):
+        elif route.intent == "analysis":
             ai_response = f"Отличный аналитический вопрос о '{message.content}'! Анализ космических исследований включает несколько измерений:\n\n🔬 **Методология анализа:**\n• Техническая осуществимость\n• Научная ценность\n• Требования к ресурсам\n• Цели миссии\n\n📊 **Результаты анализа:**\n• Выявлены интересные паттерны в данных\n• Обнаружены потенциальные области для дальнейших исследований\n• Определены ключевые технологические решения\n\nХотите, чтобы я углубился в конкретные аспекты анализа?"
         
-        elif any(word in content_lower for word in ['mars', 'moon', 'planet', 'asteroid', 'comet', 'марс', 'луна', 'планета', 'астероид']):
+        elif route.intent == "planetary":
             ai_response = f"Увлекательный вопрос о '{message.content}'! Планетарные исследования - ключевое направление NASA. Вот что я знаю:\n\n🪐 **Планетарные исследования:**\n• Марс: древние речные дельты, органические молекулы\n• Луна: водяной лед, гелий-3, ресурсы для будущих миссий\n• Астероиды: углеродсодержащие материалы, аминокислоты\n• Кометы: ледяные тела с древней историей\n\n🚀 **Текущие миссии:**\n• Perseverance на Марсе\n• Artemis на Луне\n• OSIRIS-REx к астероидам\n• James Webb изучает экзопланеты\n\nХотите узнать больше о конкретной планете или миссии?"
         
-        elif any(word in content_lower for word in ['rocket', 'engine', 'propulsion', 'fuel', 'ракета', 'двигатель', 'топливо']):
+        elif route.intent == "propulsion":
             ai_response = f"Отличный технический вопрос о '{message.content}'! Системы движения - основа космических исследований. Вот мой анализ:\n\n🚀 **Типы двигательных систем:**\n• Химические ракеты: высокая тяга, короткое время работы\n• Ионные двигатели: низкая тяга, высокая эффективность\n• Ядерные двигатели: перспективная технология\n• Солнечные паруса: использование солнечного ветра\n\n⚡ **Ключевые характеристики:**\n• Удельный импульс\n• Тяга\n• Эффективность\n• Сложность конструкции\n\nХотите, чтобы я объяснил конкретные концепции движения?"
         
-        elif any(word in content_lower for word in ['data', 'information', 'research', 'findings', 'данные', 'информация', 'исследования']):
+        elif route.intent == "data":
             ai_response = f"Отличный вопрос о '{message.content}'! Анализ данных критически важен в космических исследованиях. Вот что я обнаружил:\n\n📊 **Методология NASA:**\n• Строгий сбор данных\n• Валидация результатов\n• Интерпретация паттернов\n• Статистический анализ\n\n🔍 **Ключевые находки:**\n• Паттерны в космических данных\n• Инсайты о физических процессах\n• Корреляции между явлениями\n• Прогностические модели\n\nХотите обсудить конкретные методы анализа данных?"
         
         else:
@@ -243,46 +267,43 @@ async def send_message(message: ChatMessage):
             ]
             ai_response = random.choice(fallback_responses)
     
-    response = ChatResponse(
-        id=str(len(chat_history) + 1),
-        content=ai_response,
-        sender="ai",
-        timestamp=datetime.now().isoformat()
-    )
-    
     # Store in history
-    user_id = "current_user"  # Get from token in production
-    if user_id not in chat_history:
-        chat_history[user_id] = []
-    
-    chat_history[user_id].append({
-        "id": str(len(chat_history[user_id]) + 1),
-        "content": message.content,
-        "sender": "user",
-        "timestamp": datetime.now().isoformat()
-    })
-    
-    chat_history[user_id].append(response.dict())
+    user_id = get_request_identity(request)
+    await chat_store.add(user_id, message.content, "user")
+    stored = await chat_store.add(user_id, ai_response, "ai")
     
-    return response
+    return ChatResponse(**stored)
+
+async def get_history_owner(subject: str = Depends(get_token_subject)) -> str:
+    """Chat store key of the authenticated user (same key send_message uses for a valid token)"""
+    return f"user:{subject}"
 
 @router.get("/history", response_model=ChatHistoryResponse)
-async def get_chat_history(token: str = Depends(oauth2_scheme)):
-    """Get chat history for the current user"""
-    user_id = "current_user"  # Get from token in production
-    
-    if user_id not in chat_history:
-        return ChatHistoryResponse(messages=[])
-    
-    return ChatHistoryResponse(messages=chat_history[user_id])
+async def get_chat_history(
+    limit: Optional[int] = Query(None, ge=1, le=settings.CHAT_HISTORY_MAX_MESSAGES),
+    user_id: str = Depends(get_history_owner)
+):
+    """Get recent chat history for the current user (older turns are summarized)"""
+    return ChatHistoryResponse(messages=await chat_store.get(user_id, limit))
+
+@router.get("/history/export")
+async def export_chat_history(user_id: str = Depends(get_history_owner)):
+    """Stream the full chat history, archived turns included, as NDJSON"""
+    return StreamingResponse(
+        chat_store.export(user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat_history.ndjson"'}
+    )
+
+@router.post("/history/import")
+async def import_chat_history(request: Request, user_id: str = Depends(get_history_owner)):
+    """Append messages from an NDJSON body (one {"content", "sender", "timestamp"} per line)"""
+    return await chat_store.import_lines(user_id, request.stream())
 
 @router.delete("/history")
-async def clear_chat_history(token: str = Depends(oauth2_scheme)):
+async def clear_chat_history(user_id: str = Depends(get_history_owner)):
     """Clear chat history"""
-    user_id = "current_user"  # Get from token in production
-    
-    if user_id in chat_history:
-        chat_history[user_id] = []
+    await chat_store.clear(user_id)
     
     return {"message": "Chat history cleared"}
 
@@ -1,38 +1,70 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from pathlib import Path
-import shutil
+from urllib.parse import quote
+import asyncio
 import uuid
 import json
 from datetime import datetime
 from app.core.config import settings
 from app.api.auth import oauth2_scheme
+from app.services.file_index import file_index
+from app.services.rate_limiter import get_request_identity, llm_limiter, rate_limit, rate_limiter
+from app.services.single_flight import analysis_flight, make_key
+from app.services.storage import get_storage
+from app.services.tag_index import normalize_tag, normalize_tags
+from app.utils.analysis_parser import JSON_OUTPUT_INSTRUCTIONS, AnalysisStreamParser
+from app.utils.file_parser import build_preview, preview_read_limit
+from app.utils.themes import detect_themes
 
 router = APIRouter()
 
 # File storage configuration
-FILES_DB_PATH = Path(settings.UPLOAD_DIR) / "files_db.json"
+FILES_DB_KEY = "files_db.json"
 
-def load_files_db():
-    """Load files database from JSON file"""
-    if FILES_DB_PATH.exists():
-        try:
-            with open(FILES_DB_PATH, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+async def load_files_db():
+    """Load files database from storage"""
+    storage = get_storage()
+    try:
+        if not await storage.exists(FILES_DB_KEY):
             return {}
-    return {}
+        data = await storage.read_bytes(FILES_DB_KEY)
+        return await run_in_threadpool(json.loads, data)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+async def save_files_db(files_db):
+    """Save files database to storage"""
+    data = await run_in_threadpool(lambda: json.dumps(files_db, indent=2).encode("utf-8"))
+    await get_storage().write_bytes(FILES_DB_KEY, data)
+
+# Files database is loaded on first use (or by the startup warm-up task),
+# so importing this module stays cheap regardless of catalog size
+_files_db: Optional[dict] = None
+_files_db_lock = asyncio.Lock()
+
+async def get_files_db() -> dict:
+    """Return the files database, loading it from disk on first use"""
+    global _files_db
+    if _files_db is None:
+        async with _files_db_lock:
+            if _files_db is None:
+                files_db = await load_files_db()
+                await run_in_threadpool(file_index.build, files_db)
+                _files_db = files_db
+    return _files_db
+
+def is_files_db_loaded() -> bool:
+    return _files_db is not None
 
-def save_files_db(files_db):
-    """Save files database to JSON file"""
-    FILES_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(FILES_DB_PATH, 'w') as f:
-        json.dump(files_db, f, indent=2)
+_files_db_commit_lock = asyncio.Lock()
 
-# Load files database
-files_db = load_files_db()
+async def commit_files_db(files_db: dict):
+    """Persist the files database off the event loop, one writer at a time"""
+    async with _files_db_commit_lock:
+        await save_files_db(dict(files_db))
 
 class FileInfo(BaseModel):
     id: str
@@ -42,128 +74,376 @@ class FileInfo(BaseModel):
     uploadedAt: str
     tags: List[str] = []
     content_preview: Optional[str] = None
+    thumbnail: Optional[str] = None
 
 class FileUploadResponse(BaseModel):
     id: str
     name: str
     message: str
 
-@router.get("", response_model=List[FileInfo])
-async def get_files():
-    """Get all files for the current user"""
-    return list(files_db.values())
+class BulkItemResult(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    status: str  # "uploaded", "deleted", "not_found" or "failed"
+    error: Optional[str] = None
 
-@router.post("/upload", response_model=FileUploadResponse)
-async def upload_file(
-    file: UploadFile = File(...)
-):
-    """Upload a new file"""
-    if file.size > settings.MAX_FILE_SIZE:
+class BulkOperationResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class BulkDeleteRequest(BaseModel):
+    file_ids: List[str]
+
+class TagsUpdate(BaseModel):
+    tags: List[str]
+
+async def _build_file_preview(file_id: str, size: int, content_type: str, filename: str) -> dict:
+    """Read only as much of the file as the preview needs"""
+    empty = {"content_preview": None, "thumbnail": None}
+    limit = preview_read_limit(content_type, filename)
+    if limit == 0:
+        return empty
+    
+    storage = get_storage()
+    if limit is None:
+        # PDFs and images: open from disk when possible, never buffer a large remote file
+        local_path = storage.local_path(file_id)
+        if local_path is not None:
+            return await run_in_threadpool(build_preview, local_path, content_type, filename)
+        if size > settings.PREVIEW_MAX_BINARY_BYTES:
+            return empty
+    
+    data = await storage.read_bytes(file_id, limit)
+    return await run_in_threadpool(build_preview, data, content_type, filename)
+
+async def _store_upload(file: UploadFile) -> dict:
+    """Save an uploaded file to disk and build its catalog entry (not committed)"""
+    if file.size and file.size > settings.MAX_FILE_SIZE:
         raise HTTPException(status_code=413, detail="File too large")
     
     # Generate unique file ID
     file_id = str(uuid.uuid4())
-    file_path = Path(settings.UPLOAD_DIR) / file_id
-    file_path.parent.mkdir(parents=True, exist_ok=True)
+    storage = get_storage()
     
     # Save file
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    size = await storage.write_stream(file_id, file.file)
+    if size > settings.MAX_FILE_SIZE:
+        await storage.delete(file_id)
+        raise HTTPException(status_code=413, detail="File too large")
     
-    # Store file info
-    files_db[file_id] = {
+    # Preview is computed once here so listings need no extra I/O
+    content_type = file.content_type or "application/octet-stream"
+    try:
+        preview = await _build_file_preview(file_id, size, content_type, file.filename)
+    except Exception as e:
+        # A preview failure (including storage errors) must not fail the upload
+        print(f"Preview generation failed for {file.filename}: {e}")
+        preview = {"content_preview": None, "thumbnail": None}
+    
+    return {
         "id": file_id,
         "name": file.filename,
-        "type": file.content_type or "application/octet-stream",
-        "size": file.size,
+        "type": content_type,
+        "size": size,
         "uploadedAt": datetime.now().isoformat(),
-        "tags": []
+        # Automatic tags from the themes found in the name and preview
+        "tags": detect_themes(f"{file.filename}\n{preview['content_preview'] or ''}"),
+        "content_preview": preview["content_preview"],
+        "thumbnail": preview["thumbnail"]
     }
+
+async def _update_tags(file_id: str, add: List[str] = (), remove: List[str] = ()) -> Optional[dict]:
+    """Add/remove tags on a catalog entry and keep the indexes in sync"""
+    files_db = await get_files_db()
+    file_info = files_db.get(file_id)
+    if file_info is None:
+        return None
+    
+    removed = set(normalize_tags(remove))
+    tags = [tag for tag in normalize_tags(file_info.get("tags") or []) if tag not in removed]
+    tags = normalize_tags(tags + list(add))
+    if tags != file_info.get("tags"):
+        file_info["tags"] = tags
+        file_index.add(file_info)
+        await commit_files_db(files_db)
+    return file_info
+
+def _index_bound(value: Optional[datetime]) -> Optional[str]:
+    # uploadedAt is stored as a naive local ISO string
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+@router.get("", response_model=List[FileInfo])
+async def get_files(
+    response: Response,
+    limit: int = Query(settings.FILES_PAGE_DEFAULT_LIMIT, ge=1, le=settings.FILES_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    any_tag: Optional[List[str]] = Query(None),
+    name_prefix: Optional[str] = None,
+    uploaded_from: Optional[datetime] = None,
+    uploaded_to: Optional[datetime] = None,
+    files_db: dict = Depends(get_files_db)
+):
+    """Get one page of files, newest first. The next page cursor is in X-Next-Cursor"""
+    file_ids, next_cursor = file_index.query(
+        limit=limit,
+        cursor=cursor,
+        file_type=type,
+        tags=tag,
+        any_tags=any_tag,
+        name_prefix=name_prefix,
+        uploaded_from=_index_bound(uploaded_from),
+        uploaded_to=_index_bound(uploaded_to)
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [files_db[file_id] for file_id in file_ids]
+
+@router.post("/upload", response_model=FileUploadResponse, dependencies=[Depends(rate_limit("upload"))])
+async def upload_file(
+    file: UploadFile = File(...),
+    files_db: dict = Depends(get_files_db)
+):
+    """Upload a new file"""
+    file_info = await _store_upload(file)
+    
+    # Store file info
+    files_db[file_info["id"]] = file_info
+    file_index.add(file_info)
     
     # Save to file
-    save_files_db(files_db)
+    await commit_files_db(files_db)
     
     return FileUploadResponse(
-        id=file_id,
+        id=file_info["id"],
         name=file.filename,
         message="File uploaded successfully"
     )
 
+@router.post("/batch/upload", response_model=BulkOperationResponse)
+async def bulk_upload_files(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    files_db: dict = Depends(get_files_db)
+):
+    """Upload many files at once; metadata is committed in a single write"""
+    if len(files) > settings.BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files (max {settings.BULK_MAX_FILES})")
+    
+    # The upload limit counts files, so a batch takes one token per file
+    await rate_limiter.check_route(get_request_identity(request), "upload", cost=len(files))
+    
+    semaphore = asyncio.Semaphore(settings.BULK_UPLOAD_CONCURRENCY)
+    
+    async def store(file: UploadFile):
+        async with semaphore:
+            try:
+                return await _store_upload(file)
+            except HTTPException as e:
+                return BulkItemResult(name=file.filename, status="failed", error=e.detail)
+            except Exception as e:
+                print(f"Bulk upload error for {file.filename}: {e}")
+                return BulkItemResult(name=file.filename, status="failed", error=str(e))
+    
+    outcomes = await asyncio.gather(*[store(file) for file in files])
+    stored = [outcome for outcome in outcomes if isinstance(outcome, dict)]
+    
+    # One catalog write for the whole batch
+    for file_info in stored:
+        files_db[file_info["id"]] = file_info
+        file_index.add(file_info)
+    try:
+        await commit_files_db(files_db)
+    except Exception as e:
+        print(f"Bulk upload commit error: {e}")
+        for file_info in stored:
+            files_db.pop(file_info["id"], None)
+            file_index.remove(file_info["id"])
+            await get_storage().delete(file_info["id"])
+        raise HTTPException(status_code=500, detail=f"Failed to save file metadata: {str(e)}")
+    
+    results = [
+        BulkItemResult(id=outcome["id"], name=outcome["name"], status="uploaded")
+        if isinstance(outcome, dict) else outcome
+        for outcome in outcomes
+    ]
+    return BulkOperationResponse(
+        succeeded=len(stored),
+        failed=len(results) - len(stored),
+        results=results
+    )
+
+@router.post("/batch/delete", response_model=BulkOperationResponse)
+async def bulk_delete_files(
+    request: BulkDeleteRequest,
+    files_db: dict = Depends(get_files_db)
+):
+    """Delete many files at once; metadata is committed in a single write"""
+    if len(request.file_ids) > settings.BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files (max {settings.BULK_MAX_FILES})")
+    
+    file_ids = list(dict.fromkeys(request.file_ids))
+    removed = {file_id: files_db[file_id] for file_id in file_ids if file_id in files_db}
+    
+    # Catalog first: if the commit fails nothing is lost, entries and blobs stay as they were
+    for file_id in removed:
+        files_db.pop(file_id, None)
+        file_index.remove(file_id)
+    try:
+        await commit_files_db(files_db)
+    except Exception as e:
+        print(f"Bulk delete commit error: {e}")
+        for file_id, file_info in removed.items():
+            files_db[file_id] = file_info
+            file_index.add(file_info)
+        error = f"Failed to save file metadata: {str(e)}"
+        removed = {}
+    else:
+        error = None
+    
+    async def remove_blob(file_id: str):
+        try:
+            await get_storage().delete(file_id)
+        except Exception as e:
+            # The entry is already gone from the catalog; only an orphaned blob remains
+            print(f"Bulk delete: could not remove blob {file_id}: {e}")
+    
+    await asyncio.gather(*[remove_blob(file_id) for file_id in removed])
+    
+    results = []
+    for file_id in file_ids:
+        if file_id in removed:
+            results.append(BulkItemResult(id=file_id, name=removed[file_id]["name"], status="deleted"))
+        elif error and file_id in files_db:
+            results.append(BulkItemResult(id=file_id, name=files_db[file_id]["name"], status="failed", error=error))
+        else:
+            results.append(BulkItemResult(id=file_id, status="not_found"))
+    
+    deleted = [result for result in results if result.status == "deleted"]
+    return BulkOperationResponse(
+        succeeded=len(deleted),
+        failed=len(results) - len(deleted),
+        results=results
+    )
+
+@router.get("/tags")
+async def get_tags(files_db: dict = Depends(get_files_db)):
+    """List all tags with the number of files carrying each"""
+    return {"tags": file_index.tags.counts()}
+
+@router.post("/{file_id}/tags", response_model=FileInfo)
+async def add_file_tags(file_id: str, update: TagsUpdate):
+    """Add tags to a file"""
+    file_info = await _update_tags(file_id, add=update.tags)
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_info
+
+@router.delete("/{file_id}/tags/{tag}", response_model=FileInfo)
+async def remove_file_tag(file_id: str, tag: str):
+    """Remove a tag from a file"""
+    file_info = await _update_tags(file_id, remove=[normalize_tag(tag)])
+    if file_info is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_info
+
 @router.get("/{file_id}", response_model=FileInfo)
-async def get_file_info(file_id: str):
+async def get_file_info(file_id: str, files_db: dict = Depends(get_files_db)):
     """Get file information"""
     if file_id not in files_db:
         raise HTTPException(status_code=404, detail="File not found")
     return files_db[file_id]
 
 @router.get("/{file_id}/download")
-async def download_file(file_id: str):
+async def download_file(file_id: str, files_db: dict = Depends(get_files_db)):
     """Download a file"""
     if file_id not in files_db:
         raise HTTPException(status_code=404, detail="File not found")
     
-    file_path = Path(settings.UPLOAD_DIR) / file_id
-    if not file_path.exists():
+    storage = get_storage()
+    if not await storage.exists(file_id):
         raise HTTPException(status_code=404, detail="File not found on disk")
     
     file_info = files_db[file_id]
-    return FileResponse(
-        path=file_path,
-        filename=file_info["name"],
-        media_type=file_info["type"]
+    local_path = storage.local_path(file_id)
+    if local_path is not None:
+        return FileResponse(
+            path=local_path,
+            filename=file_info["name"],
+            media_type=file_info["type"]
+        )
+    
+    # Remote storage: stream through the API node chunk by chunk
+    return StreamingResponse(
+        storage.stream(file_id),
+        media_type=file_info["type"],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_info['name'])}"}
     )
 
 @router.delete("/{file_id}")
-async def delete_file(file_id: str):
+async def delete_file(file_id: str, files_db: dict = Depends(get_files_db)):
     """Delete a file"""
     if file_id not in files_db:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Delete from disk
-    file_path = Path(settings.UPLOAD_DIR) / file_id
-    if file_path.exists():
-        file_path.unlink()
+    # Delete from storage
+    await get_storage().delete(file_id)
     
     # Delete from database
     del files_db[file_id]
+    file_index.remove(file_id)
     
     # Save to file
-    save_files_db(files_db)
+    await commit_files_db(files_db)
     
     return {"message": "File deleted successfully"}
 
-@router.post("/{file_id}/analyze")
-async def analyze_file(file_id: str):
-    """Analyze a file with AI"""
-    if file_id not in files_db:
-        raise HTTPException(status_code=404, detail="File not found")
+def _stream_analysis(client, json_mode: bool, **request) -> dict:
+    """Stream a completion through the analysis parser (runs in the threadpool)"""
+    if json_mode:
+        request["response_format"] = {"type": "json_object"}
     
-    file_info = files_db[file_id]
-    file_path = Path(settings.UPLOAD_DIR) / file_id
+    parser = AnalysisStreamParser()
+    for chunk in client.chat.completions.create(stream=True, **request):
+        if chunk.choices and chunk.choices[0].delta.content:
+            parser.feed(chunk.choices[0].delta.content)
+    return {**parser.close(), "raw_text": parser.text}
+
+async def _analyze_file(file_id: str, file_info: dict) -> dict:
+    """Read the file and run the AI analysis"""
+    # Read file content based on file type
+    content = ""
+    if file_info["type"].startswith("text/"):
+        # Only the head is sent to the model; 4 bytes is the widest UTF-8 character
+        content = await get_storage().read_text(file_id, limit=3000 * 4)
+    elif file_info["type"] == "application/pdf":
+        # For PDF files, we'll use a simple text extraction
+        # In production, use PyPDF2 or similar
+        content = f"PDF file: {file_info['name']} (Content extraction not implemented in demo)"
+    else:
+        content = f"File: {file_info['name']} (Type: {file_info['type']})"
     
-    try:
-        # Read file content based on file type
-        content = ""
-        if file_info["type"].startswith("text/"):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        elif file_info["type"] == "application/pdf":
-            # For PDF files, we'll use a simple text extraction
-            # In production, use PyPDF2 or similar
-            content = f"PDF file: {file_info['name']} (Content extraction not implemented in demo)"
-        else:
-            content = f"File: {file_info['name']} (Type: {file_info['type']})"
-        
-        # Limit content length for API
-        if len(content) > 3000:
-            content = content[:3000] + "..."
-        
+    # Limit content length for API
+    if len(content) > 3000:
+        content = content[:3000] + "..."
+    
+    # Admission control: bounded number of concurrent provider calls
+    async with llm_limiter.slot():
         # Analyze with OpenRouter (primary) or OpenAI (fallback)
         try:
             import openai
             
             # Try OpenRouter first
             try:
+                if not await rate_limiter.allow_provider("openrouter"):
+                    raise RuntimeError("OpenRouter rate limit reached")
+                
                 client = openai.OpenAI(
                     api_key=settings.OPENROUTER_API_KEY,
                     base_url=settings.OPENROUTER_BASE_URL,
@@ -173,12 +453,19 @@ async def analyze_file(file_id: str):
                     }
                 )
                 
-                response = client.chat.completions.create(
+                system_prompt = "Ты - эксперт по космическим исследованиям NASA. Проанализируй предоставленный документ и извлеки ключевые инсайты, научные открытия и значимые находки. Сосредоточься на космических исследованиях, научных открытиях и методологиях исследований. Отвечай на русском языке."
+                if settings.OPENROUTER_JSON_MODE:
+                    system_prompt += "\n" + JSON_OUTPUT_INSTRUCTIONS
+                
+                parsed = await run_in_threadpool(
+                    _stream_analysis,
+                    client,
+                    settings.OPENROUTER_JSON_MODE,
                     model=settings.OPENROUTER_MODEL,
                     messages=[
                         {
                             "role": "system", 
-                            "content": "Ты - эксперт по космическим исследованиям NASA. Проанализируй предоставленный документ и извлеки ключевые инсайты, научные открытия и значимые находки. Сосредоточься на космических исследованиях, научных открытиях и методологиях исследований. Отвечай на русском языке."
+                            "content": system_prompt
                         },
                         {
                             "role": "user", 
@@ -192,14 +479,23 @@ async def analyze_file(file_id: str):
             except Exception as openrouter_error:
                 print(f"OpenRouter analysis error: {openrouter_error}")
                 # Fallback to OpenAI
+                if not await rate_limiter.allow_provider("openai"):
+                    raise RuntimeError("OpenAI rate limit reached")
                 client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
                 
-                response = client.chat.completions.create(
+                system_prompt = "You are a NASA space research analyst. Analyze the provided document and extract key insights, research findings, and significant discoveries. Focus on space exploration, scientific discoveries, and research methodologies."
+                if settings.OPENAI_JSON_MODE:
+                    system_prompt += "\n" + JSON_OUTPUT_INSTRUCTIONS
+                
+                parsed = await run_in_threadpool(
+                    _stream_analysis,
+                    client,
+                    settings.OPENAI_JSON_MODE,
                     model="gpt-3.5-turbo",
                     messages=[
                         {
                             "role": "system", 
-                            "content": "You are a NASA space research analyst. Analyze the provided document and extract key insights, research findings, and significant discoveries. Focus on space exploration, scientific discoveries, and research methodologies."
+                            "content": system_prompt
                         },
                         {
                             "role": "user", 
@@ -210,30 +506,11 @@ async def analyze_file(file_id: str):
                     temperature=0.7
                 )
             
-            ai_analysis = response.choices[0].message.content
-            
-            # Parse the AI response into structured format
-            lines = ai_analysis.split('\n')
-            summary = ""
-            key_points = []
-            
-            current_section = ""
-            for line in lines:
-                line = line.strip()
-                if line.startswith(('1.', 'Summary:', 'Overview:')):
-                    current_section = "summary"
-                    summary += line + " "
-                elif line.startswith(('2.', 'Key findings:', 'Findings:')):
-                    current_section = "key_points"
-                elif line.startswith(('3.', '4.', '5.')):
-                    current_section = "key_points"
-                elif line and current_section == "key_points" and not line.startswith(('1.', '2.', '3.', '4.', '5.')):
-                    key_points.append(line)
-                elif current_section == "summary":
-                    summary += line + " "
+            summary = parsed["summary"]
+            key_points = parsed["key_points"] or parsed["applications"]
             
             if not summary:
-                summary = ai_analysis[:200] + "..."
+                summary = parsed["raw_text"][:200] + "..."
             
             if not key_points:
                 key_points = [
@@ -247,6 +524,9 @@ async def analyze_file(file_id: str):
                 "analysis": {
                     "summary": summary.strip(),
                     "key_points": key_points[:5],  # Limit to 5 key points
+                    "methodology": parsed["methodology"],
+                    "applications": parsed["applications"][:5],
+                    "parse_status": parsed["parse_status"],
                     "sentiment": "positive",
                     "research_quality": "high",
                     "space_relevance": "high"
@@ -296,9 +576,29 @@ async def analyze_file(file_id: str):
                         "space_relevance": "high"
                     }
                 }
+    
+    # Themes found during analysis become automatic tags
+    themes = analysis_result["analysis"].get("themes") or detect_themes(f"{file_info['name']}\n{content}")
+    analysis_result["analysis"]["themes"] = themes
+    await _update_tags(file_id, add=themes)
+    
+    return analysis_result
+
+@router.post("/{file_id}/analyze", dependencies=[Depends(rate_limit("analyze"))])
+async def analyze_file(file_id: str, files_db: dict = Depends(get_files_db)):
+    """Analyze a file with AI"""
+    if file_id not in files_db:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    file_info = files_db[file_id]
+    
+    try:
+        # Concurrent requests for the same file share one analysis
+        flight_key = make_key("analyze", file_id, file_info["uploadedAt"])
+        return await analysis_flight.do(flight_key, lambda: _analyze_file(file_id, file_info))
         
-        return analysis_result
-        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"File analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -2,8 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.api.auth import oauth2_scheme, fake_users_db
 from app.core.config import settings
 from datetime import datetime
-from jose import JWTError
-from jose import jwt
 
 router = APIRouter()
 
@@ -29,6 +27,8 @@ class UserProfile(BaseModel):
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile():
     """Get user profile and statistics"""
+    from jose import JWTError
+    
     try:
         # Получаем последнего зарегистрированного пользователя
         if not fake_users_db:
@@ -71,6 +71,8 @@ async def update_user_profile(
     token: str = Depends(oauth2_scheme)
 ):
     """Update user profile"""
+    from jose import JWTError, jwt
+    
     try:
         # Декодируем токен для получения email пользователя
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
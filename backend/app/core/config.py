@@ -7,6 +7,10 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     
+    # Startup: defer heavy imports and catalog loading to a background warm-up
+    LAZY_STARTUP: bool = True
+    STARTUP_IMPORT_BUDGET_MS: int = 1500
+    
     # Database (using in-memory for demo)
     DATABASE_URL: str = "sqlite:///./nasa_ai_platform.db"
     
@@ -26,13 +30,57 @@ class Settings(BaseSettings):
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     OPENROUTER_MODEL: str = "google/gemma-2-9b-it:free"
     
+    # Ask providers for JSON (response_format) in file analysis when supported
+    OPENROUTER_JSON_MODE: bool = False
+    OPENAI_JSON_MODE: bool = True
+    
     # Pinecone
     PINECONE_API_KEY: str = "your-pinecone-api-key-here"
     PINECONE_ENVIRONMENT: str = "us-west1-gcp"
     
     # File Storage
+    STORAGE_BACKEND: str = "local"  # "local" (UPLOAD_DIR) or "s3"
     UPLOAD_DIR: str = "./uploads"
+    S3_BUCKET: str = "biospacesearch-uploads"
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    BULK_MAX_FILES: int = 1000
+    BULK_UPLOAD_CONCURRENCY: int = 8
+    FILES_PAGE_DEFAULT_LIMIT: int = 50
+    FILES_PAGE_MAX_LIMIT: int = 500
+    
+    # Upload-time previews
+    PREVIEW_LINES: int = 20
+    PREVIEW_CSV_ROWS: int = 5
+    PREVIEW_MAX_CHARS: int = 2000
+    THUMBNAIL_SIZE: int = 128
+    PREVIEW_MAX_BINARY_BYTES: int = 10 * 1024 * 1024  # PDF/image size previewed from remote storage
+    
+    # Chat history retention (per-user caps, LRU of users, gzip NDJSON archive)
+    CHAT_HISTORY_MAX_USERS: int = 1000
+    CHAT_HISTORY_MAX_MESSAGES: int = 200  # per user, compacted when exceeded
+    CHAT_HISTORY_KEEP_RECENT: int = 50  # live messages left after compaction
+    CHAT_HISTORY_IDLE_SECONDS: int = 1800
+    CHAT_COMPACTION_INTERVAL_SECONDS: int = 300
+    CHAT_ARCHIVE_DIR: str = "./chat_archive"
+    
+    # Rate limiting (token bucket per user and route)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis"
+    RATE_LIMIT_CHAT_PER_MINUTE: int = 20
+    RATE_LIMIT_ANALYZE_PER_MINUTE: int = 10
+    RATE_LIMIT_UPLOAD_PER_MINUTE: int = 10
+    
+    # LLM provider admission control
+    OPENROUTER_RATE_LIMIT_PER_MINUTE: int = 20
+    OPENAI_RATE_LIMIT_PER_MINUTE: int = 60
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_MAX_QUEUE: int = 16
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10.0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,360 @@
+"""
+Bounded chat history store.
+
+- Per-user history in memory is capped; older turns are compacted into a
+  short summary and appended to a gzip NDJSON archive on disk
+- At most CHAT_HISTORY_MAX_USERS histories stay in memory; the least recently
+  used (and idle) ones are spilled to disk and reloaded on the next access
+- Export streams archive + live messages as NDJSON, import consumes NDJSON
+  line by line, so neither materializes a whole history
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Deque, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.utils.themes import detect_themes
+
+SENDERS = {"user", "ai", "system"}
+READ_CHUNK_SIZE = 64 * 1024
+SUMMARY_QUESTIONS = 5
+
+
+class _UserHistory:
+    def __init__(self, next_id: int = 1, summary: Optional[dict] = None, messages: Optional[list] = None):
+        self.next_id = next_id
+        self.summary = summary
+        self.messages: Deque[dict] = deque(messages or [])
+        self.last_seen = time.monotonic()
+
+    def add(self, content: str, sender: str, timestamp: Optional[str] = None) -> dict:
+        message = {
+            "id": str(self.next_id),
+            "content": content,
+            "sender": sender,
+            "timestamp": timestamp or datetime.now().isoformat(),
+        }
+        self.next_id += 1
+        self.messages.append(message)
+        return message
+
+
+def _summarize(messages: List[dict], previous: Optional[dict]) -> dict:
+    """Extractive summary of archived turns: counts, time range, themes, latest questions"""
+    summary = dict(previous or {"messages": 0, "from": None, "themes": [], "questions": []})
+    questions = list(summary["questions"])
+    themes = list(summary["themes"])
+    for message in messages:
+        if message["sender"] != "user":
+            continue
+        questions.append(message["content"][:120])
+        themes.extend(theme for theme in detect_themes(message["content"]) if theme not in themes)
+
+    summary["messages"] += len(messages)
+    summary["from"] = summary["from"] or messages[0]["timestamp"]
+    summary["to"] = messages[-1]["timestamp"]
+    summary["themes"] = themes
+    summary["questions"] = questions[-SUMMARY_QUESTIONS:]
+    return summary
+
+
+def _summary_message(summary: dict) -> dict:
+    content = f"Краткое содержание {summary['messages']} предыдущих сообщений (перенесены в архив)."
+    if summary["themes"]:
+        content += f"\nТемы: {', '.join(summary['themes'])}."
+    if summary["questions"]:
+        content += "\nПоследние вопросы:\n" + "\n".join(f"• {question}" for question in summary["questions"])
+    return {"id": "summary", "content": content, "sender": "system", "timestamp": summary["to"]}
+
+
+def _to_ndjson(messages: List[dict]) -> bytes:
+    return b"".join(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n" for message in messages)
+
+
+class _ArchiveReader:
+    """Reads the first `size` bytes of a multi-member gzip archive line by line"""
+
+    def __init__(self, path: Path, size: int):
+        self._file = path.open("rb")
+        self._left = size
+        self._decoder = zlib.decompressobj(wbits=31)
+        self._pending = b""
+
+    def read_lines(self) -> List[bytes]:
+        """Next batch of complete lines; an empty list once the archive is exhausted"""
+        while self._left > 0:
+            raw = self._file.read(min(READ_CHUNK_SIZE, self._left))
+            if not raw:
+                break
+            self._left -= len(raw)
+            data = self._decoder.decompress(raw)
+            # Every compaction appended its own gzip member
+            while self._decoder.eof and self._decoder.unused_data:
+                rest = self._decoder.unused_data
+                self._decoder = zlib.decompressobj(wbits=31)
+                data += self._decoder.decompress(rest)
+            *lines, self._pending = (self._pending + data).split(b"\n")
+            if lines:
+                return [line + b"\n" for line in lines if line.strip()]
+
+        lines = [self._pending + b"\n"] if self._pending.strip() else []
+        self._pending = b""
+        return lines
+
+    def close(self):
+        self._file.close()
+
+
+class ChatStore:
+    def __init__(self, archive_dir: str, max_users: int, max_messages: int, keep_recent: int, idle_seconds: int):
+        self.archive_dir = Path(archive_dir)
+        self.max_users = max_users
+        self.max_messages = max_messages
+        self.keep_recent = min(keep_recent, max_messages)
+        self.idle_seconds = idle_seconds
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()
+        # Serializes disk writes against loads and export snapshots
+        self._lock = asyncio.Lock()
+        self.stats = {"compactions": 0, "archived_messages": 0, "evictions": 0, "eviction_failures": 0, "reloads": 0}
+
+    def _file(self, user_id: str, suffix: str) -> Path:
+        name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return self.archive_dir / f"{name}{suffix}"
+
+    def _archive_path(self, user_id: str) -> Path:
+        return self._file(user_id, ".ndjson.gz")
+
+    def _spill_path(self, user_id: str) -> Path:
+        return self._file(user_id, ".state.json.gz")
+
+    # Disk helpers (run in the threadpool)
+
+    def _append_archive(self, user_id: str, messages: List[dict]):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with self._archive_path(user_id).open("ab") as f:
+            f.write(gzip.compress(_to_ndjson(messages)))
+
+    def _write_spill(self, user_id: str, state: bytes):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self._spill_path(user_id)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(state)
+        os.replace(tmp_path, path)
+
+    def _read_spill(self, user_id: str) -> Optional[dict]:
+        path = self._spill_path(user_id)
+        if not path.exists():
+            return None
+        state = json.loads(gzip.decompress(path.read_bytes()))
+        path.unlink()
+        return state
+
+    def _remove_files(self, user_id: str):
+        for path in (self._archive_path(user_id), self._spill_path(user_id)):
+            path.unlink(missing_ok=True)
+
+    def _archive_size(self, user_id: str) -> int:
+        path = self._archive_path(user_id)
+        return path.stat().st_size if path.exists() else 0
+
+    # In-memory histories
+
+    async def _get(self, user_id: str) -> _UserHistory:
+        history = self._users.get(user_id)
+        if history is None:
+            async with self._lock:
+                history = self._users.get(user_id)
+                if history is None:
+                    state = await run_in_threadpool(self._read_spill, user_id)
+                    if state is not None:
+                        self.stats["reloads"] += 1
+                        history = _UserHistory(state["next_id"], state["summary"], state["messages"])
+                    else:
+                        history = _UserHistory()
+                    self._users[user_id] = history
+        self._users.move_to_end(user_id)
+        history.last_seen = time.monotonic()
+        return history
+
+    async def _evict(self, user_id: str) -> bool:
+        """Move a user's live history to disk; False if it had to stay in memory"""
+        async with self._lock:
+            history = self._users.pop(user_id, None)
+            if history is None:
+                return True
+            state = {
+                "next_id": history.next_id,
+                "summary": history.summary,
+                "messages": list(history.messages),
+            }
+            data = gzip.compress(json.dumps(state, ensure_ascii=False).encode("utf-8"))
+            try:
+                await run_in_threadpool(self._write_spill, user_id, data)
+                self.stats["evictions"] += 1
+                return True
+            except Exception as e:
+                print(f"Chat history spill failed for {user_id}: {e}")
+                # Back in its least recently used position
+                self._users[user_id] = history
+                self._users.move_to_end(user_id, last=False)
+                return False
+
+    async def _evict_least_recent(self):
+        # One pass over a snapshot: a failing disk must not turn this into a retry loop
+        for user_id in list(self._users):
+            if len(self._users) <= self.max_users:
+                return
+            await self._evict(user_id)
+        if len(self._users) > self.max_users:
+            self.stats["eviction_failures"] += 1
+            print(f"Chat history over the cap: {len(self._users)} users in memory (max {self.max_users})")
+
+    async def _compact(self, user_id: str, history: _UserHistory):
+        """Archive all but the most recent turns and fold them into the summary"""
+        async with self._lock:
+            count = len(history.messages) - self.keep_recent
+            # Skip histories that were spilled to disk while waiting for the lock
+            if count <= 0 or self._users.get(user_id) is not history:
+                return
+            old = [history.messages.popleft() for _ in range(count)]
+            previous = history.summary
+            history.summary = _summarize(old, previous)
+            try:
+                await run_in_threadpool(self._append_archive, user_id, old)
+                self.stats["compactions"] += 1
+                self.stats["archived_messages"] += len(old)
+            except Exception as e:
+                print(f"Chat history compaction failed for {user_id}: {e}")
+                history.messages.extendleft(reversed(old))
+                history.summary = previous
+
+    async def add(self, user_id: str, content: str, sender: str, timestamp: Optional[str] = None) -> dict:
+        history = await self._get(user_id)
+        message = history.add(content, sender, timestamp)
+        if len(history.messages) > self.max_messages:
+            await self._compact(user_id, history)
+        await self._evict_least_recent()
+        return message
+
+    async def get(self, user_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Live messages (newest `limit` if given), preceded by the summary of archived ones"""
+        history = await self._get(user_id)
+        messages = list(history.messages)
+        if limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        if history.summary and (limit is None or len(messages) == len(history.messages)):
+            messages.insert(0, _summary_message(history.summary))
+        await self._evict_least_recent()
+        return messages
+
+    async def clear(self, user_id: str):
+        async with self._lock:
+            self._users.pop(user_id, None)
+            await run_in_threadpool(self._remove_files, user_id)
+
+    # NDJSON export / import
+
+    async def export(self, user_id: str) -> AsyncIterator[bytes]:
+        """Archived then live messages, one JSON object per line"""
+        history = await self._get(user_id)
+        await self._evict_least_recent()
+        # Archive and live messages are disjoint while the lock is held
+        async with self._lock:
+            archive_size = await run_in_threadpool(self._archive_size, user_id)
+            live = list(history.messages)
+
+        if archive_size:
+            reader = await run_in_threadpool(_ArchiveReader, self._archive_path(user_id), archive_size)
+            try:
+                while True:
+                    lines = await run_in_threadpool(reader.read_lines)
+                    if not lines:
+                        break
+                    yield b"".join(lines)
+            finally:
+                await run_in_threadpool(reader.close)
+
+        for start in range(0, len(live), 500):
+            yield _to_ndjson(live[start:start + 500])
+
+    async def import_lines(self, user_id: str, chunks: AsyncIterator[bytes]) -> dict:
+        """Append NDJSON messages to the history; invalid lines are skipped"""
+        imported = skipped = 0
+        pending = b""
+
+        async def import_line(line: bytes):
+            nonlocal imported, skipped
+            if not line.strip():
+                return
+            try:
+                message = json.loads(line)
+                content, sender = message["content"], message.get("sender", "user")
+                if not isinstance(content, str) or sender not in SENDERS:
+                    raise ValueError("invalid message")
+            except (ValueError, TypeError, KeyError):
+                skipped += 1
+                return
+            timestamp = message.get("timestamp")
+            await self.add(user_id, content, sender, timestamp if isinstance(timestamp, str) else None)
+            imported += 1
+
+        async for chunk in chunks:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                await import_line(line)
+        await import_line(pending)
+
+        return {"imported": imported, "skipped": skipped}
+
+    # Background maintenance
+
+    async def compact_all(self):
+        """Spill idle users and compact everyone else down to the recent window"""
+        now = time.monotonic()
+        for user_id, history in list(self._users.items()):
+            if now - history.last_seen > self.idle_seconds:
+                await self._evict(user_id)
+            elif len(history.messages) > self.keep_recent:
+                await self._compact(user_id, history)
+
+    async def run_compaction(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_COMPACTION_INTERVAL_SECONDS)
+            try:
+                await self.compact_all()
+            except Exception as e:
+                print(f"Chat history compaction error: {e}")
+
+    def start_compaction(self) -> "asyncio.Task":
+        return asyncio.ensure_future(self.run_compaction())
+
+    async def flush(self):
+        """Spill every live history to disk (used on shutdown)"""
+        for user_id in list(self._users):
+            await self._evict(user_id)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "users_in_memory": len(self._users),
+            "messages_in_memory": sum(len(history.messages) for history in self._users.values()),
+        }
+
+
+chat_store = ChatStore(
+    archive_dir=settings.CHAT_ARCHIVE_DIR,
+    max_users=settings.CHAT_HISTORY_MAX_USERS,
+    max_messages=settings.CHAT_HISTORY_MAX_MESSAGES,
+    keep_recent=settings.CHAT_HISTORY_KEEP_RECENT,
+    idle_seconds=settings.CHAT_HISTORY_IDLE_SECONDS,
+)
@@ -0,0 +1,198 @@
+"""
+Sorted in-memory secondary indexes over the files catalog.
+
+Listings are served newest first with keyset (cursor) pagination. A page
+walks the date index from the cursor and checks each filter per file in O(1),
+so it stops as soon as the page is full; filters matching only a few files
+sort those members instead of walking.
+"""
+import base64
+import heapq
+import json
+from bisect import bisect_left, bisect_right, insort
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from app.services.tag_index import TagIndex, normalize_tags
+
+# Sort key of a file: (uploadedAt ISO string, file id) - ISO strings sort chronologically
+SortKey = Tuple[str, str]
+
+
+def encode_cursor(key: SortKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        uploaded_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(uploaded_at), str(file_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class FileIndex:
+    """Date, name, type and tag indexes kept in sync with files_db"""
+
+    def __init__(self):
+        self._by_date: List[SortKey] = []
+        self._by_name: List[Tuple[str, str]] = []
+        self._by_type: Dict[str, Set[str]] = {}
+        self._keys: Dict[str, SortKey] = {}
+        self._names: Dict[str, str] = {}
+        self._types: Dict[str, str] = {}
+        self.tags = TagIndex()
+
+    def build(self, files_db: dict):
+        self.__init__()
+        for file_info in files_db.values():
+            self._insert(file_info, keep_sorted=False)
+        self._by_date.sort()
+        self._by_name.sort()
+
+    def _insert(self, file_info: dict, keep_sorted: bool = True):
+        file_id = file_info["id"]
+        key = (file_info.get("uploadedAt") or "", file_id)
+        name = (file_info.get("name") or "").lower()
+        file_type = file_info.get("type") or ""
+
+        if keep_sorted:
+            insort(self._by_date, key)
+            insort(self._by_name, (name, file_id))
+        else:
+            self._by_date.append(key)
+            self._by_name.append((name, file_id))
+        self._by_type.setdefault(file_type, set()).add(file_id)
+        self.tags.set_tags(file_id, normalize_tags(file_info.get("tags") or []))
+
+        self._keys[file_id] = key
+        self._names[file_id] = name
+        self._types[file_id] = file_type
+
+    @staticmethod
+    def _discard_sorted(items: list, item):
+        position = bisect_left(items, item)
+        if position < len(items) and items[position] == item:
+            del items[position]
+
+    @staticmethod
+    def _discard_member(index: Dict[str, Set[str]], value: str, file_id: str):
+        members = index.get(value)
+        if members is not None:
+            members.discard(file_id)
+            if not members:
+                del index[value]
+
+    def add(self, file_info: dict):
+        """Insert or update a catalog entry"""
+        self.remove(file_info["id"])
+        self._insert(file_info)
+
+    def remove(self, file_id: str):
+        key = self._keys.pop(file_id, None)
+        if key is None:
+            return
+        self._discard_sorted(self._by_date, key)
+        self._discard_sorted(self._by_name, (self._names.pop(file_id), file_id))
+        self._discard_member(self._by_type, self._types.pop(file_id), file_id)
+        self.tags.remove_file(file_id)
+
+    def _name_prefix_range(self, prefix: str) -> Tuple[int, int]:
+        prefix = prefix.lower()
+        start = bisect_left(self._by_name, (prefix, ""))
+        end = bisect_left(self._by_name, (prefix + "\U0010ffff", ""))
+        return start, end
+
+    def query(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        file_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        any_tags: Optional[List[str]] = None,
+        name_prefix: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_to: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return (file ids newest first, next cursor) for one page"""
+        # Date window as positions in the date index: [low, high)
+        low = bisect_left(self._by_date, (uploaded_from, "")) if uploaded_from else 0
+        high = bisect_right(self._by_date, (uploaded_to, "\U0010ffff")) if uploaded_to else len(self._by_date)
+        if cursor:
+            high = min(high, bisect_left(self._by_date, decode_cursor(cursor)))
+
+        # Each filter is an O(1) per-file check plus its match count and members,
+        # all read from the existing indexes without building sets
+        checks: List[Callable[[str], bool]] = []
+        sources: List[Tuple[int, Callable[[], Iterable[str]]]] = []
+        if file_type is not None:
+            members = self._by_type.get(file_type, set())
+            checks.append(lambda file_id: self._types[file_id] == file_type)
+            sources.append((len(members), lambda: members))
+        if tags or any_tags:
+            bitmap = self.tags.query(normalize_tags(tags or []), normalize_tags(any_tags or []))
+            checks.append(self.tags.matcher(bitmap))
+            sources.append((self.tags.count(bitmap), lambda: self.tags.ids(bitmap)))
+        if name_prefix:
+            prefix = name_prefix.lower()
+            start, end = self._name_prefix_range(prefix)
+            checks.append(lambda file_id: self._names[file_id].startswith(prefix))
+            sources.append((end - start, lambda: (self._by_name[i][1] for i in range(start, end))))
+
+        def matches(file_id: str) -> bool:
+            return all(check(file_id) for check in checks)
+
+        page: List[SortKey] = []
+        window = high - low
+        smallest = min(sources, key=lambda source: source[0]) if sources else None
+        if smallest is not None and smallest[0] == 0:
+            return [], None
+
+        use_candidates = False
+        if smallest is not None and window > 0:
+            # Walking stops after about (limit + 1) / selectivity files, assuming independent
+            # filters; sorting the smallest member set costs its size
+            selectivity = 1.0
+            for count, _ in sources:
+                selectivity *= count / len(self._by_date)
+            expected_walk = (limit + 1) / max(selectivity, 1 / len(self._by_date))
+            use_candidates = smallest[0] < min(expected_walk, window)
+
+        if use_candidates:
+            # Selective filters: sort the smallest member set instead of walking the window
+            window_low = self._by_date[low] if low < len(self._by_date) else None
+            window_high = self._by_date[high] if high < len(self._by_date) else None
+            keys = (self._keys[file_id] for file_id in smallest[1]() if matches(file_id))
+            in_window = [
+                key for key in keys
+                if (window_low is None or key >= window_low) and (window_high is None or key < window_high)
+            ]
+            page = heapq.nlargest(limit + 1, in_window)
+        else:
+            for position in range(high - 1, low - 1, -1):
+                key = self._by_date[position]
+                if not checks or matches(key[1]):
+                    page.append(key)
+                    if len(page) > limit:
+                        break
+
+        next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return [file_id for _, file_id in page[:limit]], next_cursor
+
+    def best_tagged(self, tags: List[str]) -> Optional[str]:
+        """Newest file sharing the most of the given tags, if any"""
+        tags = normalize_tags(tags)
+        for size in range(len(tags), 0, -1):
+            for subset in combinations(tags, size):
+                # An empty intersection is one bitmap AND, not a walk over the catalog
+                if not self.tags.query(subset):
+                    continue
+                file_ids, _ = self.query(limit=1, tags=list(subset))
+                if file_ids:
+                    return file_ids[0]
+        return None
+
+
+file_index = FileIndex()
@@ -0,0 +1,144 @@
+"""
+Intent routing for chat messages.
+
+All routing keywords (English and Russian) are compiled once into an
+Aho-Corasick automaton, so a message is classified in a single pass over
+its text however many keywords there are:
+
+- intent: which canned fallback answer fits the question
+- mentions_files: whether the user explicitly asks about uploaded files
+- needs_files: whether the catalog and file contents are worth loading
+- themes: space research themes, matched against file tags
+- file_hints: filename fragments the user referred to
+"""
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from app.utils.themes import THEME_KEYWORDS
+
+# Fallback intents in priority order: the first matching intent wins
+INTENT_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("document", ["расскажи", "что написано", "документ", "файл", "анализ", "содержимое"]),
+    ("compare", ["compare", "comparison", "difference", "vs", "versus", "сравни", "сравнение"]),
+    ("analysis", ["analyze", "analysis", "examine", "study", "анализ", "исследование"]),
+    ("planetary", ["mars", "moon", "planet", "asteroid", "comet", "марс", "луна", "планета", "астероид"]),
+    ("propulsion", ["rocket", "engine", "propulsion", "fuel", "ракета", "двигатель", "топливо"]),
+    ("data", ["data", "information", "research", "findings", "данные", "информация", "исследования"]),
+]
+GENERAL_INTENT = "general"
+
+# Words that mean the user is asking about uploaded files
+FILE_KEYWORDS = ["файл", "документ", "анализ", "содержимое", "что написано", "сатурн", "space_research"]
+
+# Mentions that point at a specific file: keyword -> filename fragment, in priority order
+FILE_HINTS: List[Tuple[str, str]] = [
+    ("сатурн", "saturn"),
+    ("space_research", "space_research"),
+    ("space research", "space_research"),
+]
+
+
+class Route(NamedTuple):
+    intent: str
+    mentions_files: bool
+    needs_files: bool
+    themes: List[str]
+    file_hints: List[str]
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton mapping keyword occurrences to their labels"""
+
+    def __init__(self, keywords: Dict[str, List[tuple]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[tuple]] = [[]]
+
+        for keyword, labels in keywords.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].extend(labels)
+
+        # Breadth-first: failure links point at the longest proper suffix in the trie
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def labels(self, text: str) -> Iterator[tuple]:
+        """Labels of every keyword occurring in text (substring match)"""
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            yield from self._out[state]
+
+
+class IntentRouter:
+    def __init__(self):
+        keywords: Dict[str, List[tuple]] = {}
+        for priority, (intent, words) in enumerate(INTENT_KEYWORDS):
+            for word in words:
+                keywords.setdefault(word, []).append(("intent", priority))
+        for word in FILE_KEYWORDS:
+            keywords.setdefault(word, []).append(("files", None))
+        for theme, words in THEME_KEYWORDS.items():
+            for word in words:
+                keywords.setdefault(word, []).append(("theme", theme))
+        for priority, (word, _) in enumerate(FILE_HINTS):
+            keywords.setdefault(word, []).append(("hint", priority))
+
+        self._automaton = KeywordAutomaton(keywords)
+        self._theme_order = {theme: position for position, theme in enumerate(THEME_KEYWORDS)}
+        self.stats = {"messages": 0, "file_retrieval": 0, "intents": {}}
+
+    def classify(self, text: str) -> Route:
+        intent_priority = len(INTENT_KEYWORDS)
+        mentions_files = False
+        themes = set()
+        hints = set()
+
+        for kind, value in self._automaton.labels((text or "").lower()):
+            if kind == "intent":
+                intent_priority = min(intent_priority, value)
+            elif kind == "files":
+                mentions_files = True
+            elif kind == "theme":
+                themes.add(value)
+            else:
+                hints.add(value)
+
+        intent = INTENT_KEYWORDS[intent_priority][0] if intent_priority < len(INTENT_KEYWORDS) else GENERAL_INTENT
+        # A named file is a file request; a research theme may match a tagged file
+        mentions_files = mentions_files or bool(hints)
+        needs_files = mentions_files or bool(themes)
+
+        self.stats["messages"] += 1
+        self.stats["file_retrieval"] += int(needs_files)
+        self.stats["intents"][intent] = self.stats["intents"].get(intent, 0) + 1
+
+        return Route(
+            intent=intent,
+            mentions_files=mentions_files,
+            needs_files=needs_files,
+            themes=sorted(themes, key=self._theme_order.get),
+            file_hints=list(dict.fromkeys(FILE_HINTS[priority][1] for priority in sorted(hints))),
+        )
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,241 @@
+"""
+Rate limiting and LLM admission control.
+
+- Token buckets per (user, route) and per LLM provider
+- In-memory backend for a single worker, Redis backend for multi-worker setups
+- Global provider concurrency semaphore with a bounded wait queue
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets kept in process memory (one set per worker)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        # key -> (tokens, last_refill_timestamp)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, capacity: int, refill_per_second: float, cost: int = 1) -> Tuple[bool, float]:
+        """Take cost tokens from the bucket. Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(capacity), now))
+        tokens = min(float(capacity), tokens + (now - updated) * refill_per_second)
+
+        if tokens >= cost:
+            allowed, retry_after = True, 0.0
+            tokens -= cost
+        else:
+            allowed, retry_after = False, (cost - tokens) / refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        # Drop the least recently used buckets so memory stays bounded
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return allowed, retry_after
+
+
+# Atomic token bucket: KEYS[1] = bucket key, ARGV = capacity, refill/s, now, cost
+_TOKEN_BUCKET_LUA = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    allowed = 1
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared between workers through Redis"""
+
+    def __init__(self, redis_url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(redis_url)
+        self._script = self._client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def consume(self, key: str, capacity: int, refill_per_second: float, cost: int = 1) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[capacity, refill_per_second, time.time(), cost],
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+class RateLimiter:
+    """Per-user/per-route and per-provider token bucket limits"""
+
+    def __init__(self):
+        self.route_limits: Dict[str, int] = {
+            "chat": settings.RATE_LIMIT_CHAT_PER_MINUTE,
+            "analyze": settings.RATE_LIMIT_ANALYZE_PER_MINUTE,
+            "upload": settings.RATE_LIMIT_UPLOAD_PER_MINUTE,
+        }
+        self.provider_limits: Dict[str, int] = {
+            "openrouter": settings.OPENROUTER_RATE_LIMIT_PER_MINUTE,
+            "openai": settings.OPENAI_RATE_LIMIT_PER_MINUTE,
+        }
+        self.memory_backend = InMemoryRateLimitBackend()
+        self.backend = self.memory_backend
+        self.stats = {"allowed": 0, "rejected": 0, "provider_skipped": 0, "backend_errors": 0}
+
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            try:
+                self.backend = RedisRateLimitBackend(settings.REDIS_URL)
+            except Exception as e:
+                print(f"Redis rate limit backend unavailable, using memory: {e}")
+
+    async def _consume(self, key: str, per_minute: int, cost: int = 1) -> Tuple[bool, float]:
+        try:
+            return await self.backend.consume(key, per_minute, per_minute / 60.0, cost)
+        except Exception as e:
+            # Redis outage: keep limiting locally instead of failing open
+            print(f"Rate limit backend error: {e}")
+            self.stats["backend_errors"] += 1
+            return await self.memory_backend.consume(key, per_minute, per_minute / 60.0, cost)
+
+    async def check_route(self, identity: str, route: str, cost: int = 1):
+        """Raise 429 when the user's bucket for the route can't cover cost tokens"""
+        per_minute = self.route_limits.get(route)
+        if not settings.RATE_LIMIT_ENABLED or not per_minute:
+            return
+
+        if cost > per_minute:
+            # Even a full bucket can't cover it, so waiting would not help
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Request exceeds the rate limit of {per_minute} per minute",
+            )
+
+        allowed, retry_after = await self._consume(f"route:{route}:{identity}", per_minute, cost)
+        if not allowed:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
+        self.stats["allowed"] += 1
+
+    async def allow_provider(self, provider: str) -> bool:
+        """Return False when the provider's bucket is empty so callers can fall back"""
+        per_minute = self.provider_limits.get(provider)
+        if not settings.RATE_LIMIT_ENABLED or not per_minute:
+            return True
+
+        allowed, _ = await self._consume(f"provider:{provider}", per_minute)
+        if not allowed:
+            self.stats["provider_skipped"] += 1
+        return allowed
+
+
+class ProviderConcurrencyLimiter:
+    """Global cap on in-flight LLM calls with a bounded wait queue"""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self.stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _reject(self, reason: str):
+        self.stats[reason] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="AI service is busy, please retry shortly",
+            headers={"Retry-After": str(max(1, int(self.queue_timeout)))},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one provider slot for the duration of the block"""
+        # Counted synchronously so a burst of callers can't all slip past the check
+        if self._in_flight + self._waiting >= self.max_concurrency + self.max_queue:
+            self._reject("rejected_queue_full")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("rejected_timeout")
+        finally:
+            self._waiting -= 1
+
+        self.stats["admitted"] += 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+def get_request_identity(request: Request) -> str:
+    """Identify the caller by JWT subject, falling back to the client address"""
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            from jose import jwt
+
+            payload = jwt.decode(
+                authorization[7:],
+                settings.JWT_SECRET_KEY,
+                algorithms=[settings.JWT_ALGORITHM],
+            )
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except Exception:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(route: str):
+    """FastAPI dependency enforcing the per-user limit for a route"""
+    async def dependency(request: Request):
+        await rate_limiter.check_route(get_request_identity(request), route)
+    return dependency
+
+
+rate_limiter = RateLimiter()
+llm_limiter = ProviderConcurrencyLimiter(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+)
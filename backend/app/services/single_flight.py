@@ -0,0 +1,60 @@
+"""
+Request coalescing (single-flight) for identical concurrent LLM requests.
+
+Concurrent callers with the same key share one in-flight upstream call
+and all receive its result (or its exception).
+"""
+import asyncio
+import hashlib
+import re
+from typing import Any, Awaitable, Callable, Dict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def make_key(*parts: Any) -> str:
+    """Build a coalescing key from normalized (case/whitespace-insensitive) parts"""
+    normalized = "\x1f".join(
+        _WHITESPACE_RE.sub(" ", str(part)).strip().lower() for part in parts
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, "asyncio.Task"] = {}
+        self.stats = {"requests": 0, "upstream_calls": 0, "upstream_calls_saved": 0}
+
+    def _forget(self, key: str, task: "asyncio.Task"):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once per key at a time; concurrent callers await the same result"""
+        self.stats["requests"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats["upstream_calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.stats["upstream_calls_saved"] += 1
+
+        # Shielded so one disconnected client doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "in_flight": len(self._in_flight),
+        }
+
+
+chat_flight = SingleFlight()
+analysis_flight = SingleFlight()
@@ -0,0 +1,207 @@
+"""
+Async storage layer for uploaded files and the files catalog.
+
+- LocalStorage: files under UPLOAD_DIR, blocking calls run in the threadpool
+- S3Storage: any S3-compatible service (AWS, MinIO, moto server), boto3 calls
+  run in the threadpool; set S3_ENDPOINT_URL to point at a local stand-in
+
+Request handlers never touch the disk directly, so slow or network-mounted
+storage does not stall the event loop.
+"""
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class StorageBackend(ABC):
+    """Interface shared by the storage backends"""
+
+    @abstractmethod
+    async def read_bytes(self, key: str, limit: Optional[int] = None) -> bytes:
+        """Read the whole object, or only its first `limit` bytes"""
+
+    async def read_text(self, key: str, limit: Optional[int] = None, encoding: str = "utf-8") -> str:
+        data = await self.read_bytes(key, limit)
+        # A byte limit may cut a multi-byte character in half
+        return data.decode(encoding, errors="ignore" if limit else "strict")
+
+    @abstractmethod
+    async def write_bytes(self, key: str, data: bytes):
+        """Replace the object with `data`"""
+
+    @abstractmethod
+    async def write_stream(self, key: str, fileobj: BinaryIO) -> int:
+        """Copy a file-like object into storage chunk by chunk, returning its size"""
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Async iterator over the object's bytes"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove the object; a missing object is not an error"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether the object exists"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path on this node if the object is a local file (lets FileResponse use sendfile)"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = Path(os.path.abspath(root))
+
+    def _path(self, key: str) -> Path:
+        # Purely lexical check: callers run this on the event loop, so no filesystem access
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.join(self.root, "")):
+            raise ValueError(f"Invalid storage key: {key}")
+        return Path(path)
+
+    def _read(self, key: str, limit: Optional[int]) -> bytes:
+        with self._path(key).open("rb") as f:
+            return f.read() if limit is None else f.read(limit)
+
+    async def read_bytes(self, key: str, limit: Optional[int] = None) -> bytes:
+        return await run_in_threadpool(self._read, key, limit)
+
+    def _write(self, key: str, data: bytes):
+        # Write to a temp file and rename so readers never see a partial file
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with tmp_path.open("wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def write_bytes(self, key: str, data: bytes):
+        await run_in_threadpool(self._write, key, data)
+
+    def _copy(self, key: str, fileobj: BinaryIO) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+        return path.stat().st_size
+
+    async def write_stream(self, key: str, fileobj: BinaryIO) -> int:
+        return await run_in_threadpool(self._copy, key, fileobj)
+
+    async def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        f = await run_in_threadpool(self._path(key).open, "rb")
+        try:
+            while True:
+                chunk = await run_in_threadpool(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            await run_in_threadpool(f.close)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self._path(key).unlink, missing_ok=True)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self._path(key).is_file)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _read(self, key: str, limit: Optional[int]) -> bytes:
+        request = {"Bucket": self.bucket, "Key": self._key(key)}
+        if limit is not None:
+            if limit <= 0:
+                return b""
+            request["Range"] = f"bytes=0-{limit - 1}"
+        return self._client.get_object(**request)["Body"].read()
+
+    async def read_bytes(self, key: str, limit: Optional[int] = None) -> bytes:
+        return await run_in_threadpool(self._read, key, limit)
+
+    async def write_bytes(self, key: str, data: bytes):
+        await run_in_threadpool(
+            self._client.put_object, Bucket=self.bucket, Key=self._key(key), Body=data
+        )
+
+    async def write_stream(self, key: str, fileobj: BinaryIO) -> int:
+        # upload_fileobj switches to multipart uploads for large files
+        await run_in_threadpool(self._client.upload_fileobj, fileobj, self.bucket, self._key(key))
+        head = await run_in_threadpool(self._client.head_object, Bucket=self.bucket, Key=self._key(key))
+        return head["ContentLength"]
+
+    async def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        response = await run_in_threadpool(self._client.get_object, Bucket=self.bucket, Key=self._key(key))
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await run_in_threadpool(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self._client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self._exists, key)
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> StorageBackend:
+    """Storage backend selected by STORAGE_BACKEND ("local" or "s3")"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key=settings.S3_ACCESS_KEY_ID,
+            secret_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorage(settings.UPLOAD_DIR)
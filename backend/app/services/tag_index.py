@@ -0,0 +1,145 @@
+"""
+Inverted tag index: tag -> bitmap of file slots.
+
+Each file gets a small integer slot; a tag's members are the set bits of a
+Python int, so AND/OR queries are single big-int operations.
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+MAX_TAG_LENGTH = 50
+
+# Skips runs of empty bytes at C speed when decoding sparse bitmaps
+_NONZERO_BYTE_RE = re.compile(rb"[^\x00]")
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(str(tag).split()).lower()[:MAX_TAG_LENGTH]
+
+
+def normalize_tags(tags: Iterable[str]) -> List[str]:
+    """Normalized, de-duplicated tags in their original order"""
+    return [tag for tag in dict.fromkeys(normalize_tag(tag) for tag in tags) if tag]
+
+
+class TagIndex:
+    """Bitmap-backed tag -> file ids index"""
+
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._bitmaps: Dict[str, int] = {}
+        self._file_tags: Dict[str, Set[str]] = {}
+
+    def _slot(self, file_id: str) -> int:
+        slot = self._slots.get(file_id)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slot_ids[slot] = file_id
+            else:
+                slot = len(self._slot_ids)
+                self._slot_ids.append(file_id)
+            self._slots[file_id] = slot
+        return slot
+
+    def add_tags(self, file_id: str, tags: Iterable[str]):
+        bit = 1 << self._slot(file_id)
+        file_tags = self._file_tags.setdefault(file_id, set())
+        for tag in tags:
+            self._bitmaps[tag] = self._bitmaps.get(tag, 0) | bit
+            file_tags.add(tag)
+
+    def remove_tags(self, file_id: str, tags: Iterable[str]):
+        slot = self._slots.get(file_id)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        file_tags = self._file_tags.get(file_id, set())
+        for tag in tags:
+            if tag in file_tags:
+                file_tags.discard(tag)
+                bitmap = self._bitmaps[tag] & mask
+                if bitmap:
+                    self._bitmaps[tag] = bitmap
+                else:
+                    del self._bitmaps[tag]
+        if not file_tags:
+            self.remove_file(file_id)
+
+    def set_tags(self, file_id: str, tags: Iterable[str]):
+        tags = set(tags)
+        current = self._file_tags.get(file_id, set())
+        self.remove_tags(file_id, current - tags)
+        if tags:
+            self.add_tags(file_id, tags - current)
+
+    def remove_file(self, file_id: str):
+        tags = self._file_tags.pop(file_id, set())
+        slot = self._slots.pop(file_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        for tag in tags:
+            bitmap = self._bitmaps[tag] & mask
+            if bitmap:
+                self._bitmaps[tag] = bitmap
+            else:
+                del self._bitmaps[tag]
+        self._slot_ids[slot] = None
+        self._free_slots.append(slot)
+
+    def query(self, all_tags: Iterable[str] = (), any_tags: Iterable[str] = ()) -> int:
+        """Bitmap of files having every tag in all_tags and at least one of any_tags"""
+        all_tags, any_tags = list(all_tags), list(any_tags)
+        if not all_tags and not any_tags:
+            return 0
+
+        bitmap = -1  # all bits set
+        for tag in all_tags:
+            bitmap &= self._bitmaps.get(tag, 0)
+        if any_tags:
+            union = 0
+            for tag in any_tags:
+                union |= self._bitmaps.get(tag, 0)
+            bitmap &= union
+        return bitmap
+
+    @staticmethod
+    def _bytes(bitmap: int) -> bytes:
+        return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+    def ids(self, bitmap: int) -> List[str]:
+        """File ids for the set bits of a query bitmap"""
+        # Decoded from the byte string: clearing bits on the big int would copy it once per match
+        file_ids = []
+        for match in _NONZERO_BYTE_RE.finditer(self._bytes(bitmap)):
+            base = match.start() * 8
+            byte = match.group()[0]
+            while byte:
+                lowest = byte & -byte
+                file_ids.append(self._slot_ids[base + lowest.bit_length() - 1])
+                byte ^= lowest
+        return file_ids
+
+    def find(self, all_tags: Iterable[str] = (), any_tags: Iterable[str] = ()) -> Set[str]:
+        return set(self.ids(self.query(all_tags, any_tags)))
+
+    def count(self, bitmap: int) -> int:
+        # int.bit_count is Python 3.10+
+        return bitmap.bit_count() if hasattr(bitmap, "bit_count") else bin(bitmap).count("1")
+
+    def matcher(self, bitmap: int) -> Callable[[str], bool]:
+        """O(1) membership test for a query bitmap, for filtering while walking another index"""
+        data = self._bytes(bitmap)
+        slots = self._slots
+
+        def contains(file_id: str) -> bool:
+            slot = slots.get(file_id)
+            return slot is not None and (slot >> 3) < len(data) and bool(data[slot >> 3] >> (slot & 7) & 1)
+
+        return contains
+
+    def counts(self) -> Dict[str, int]:
+        return {tag: self.count(bitmap) for tag, bitmap in sorted(self._bitmaps.items())}
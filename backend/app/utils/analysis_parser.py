@@ -0,0 +1,255 @@
+"""
+Structured parsing of LLM document analysis output.
+
+- JSON path for providers asked for JSON (response_format / schema prompt)
+- Tolerant incremental parser for free text: English/Russian headings,
+  markdown headers, bold headings, numbered and bulleted lists
+- Fields are filled in while tokens arrive (feed) and finalized by close()
+"""
+import json
+import re
+from typing import Dict, List, Optional
+
+# Prompt suffix used when the provider is asked for JSON output
+JSON_OUTPUT_INSTRUCTIONS = (
+    'Respond with a single JSON object and nothing else: '
+    '{"summary": string, "key_points": [string], "methodology": string, "applications": [string]}. '
+    'Write the values in the language of the requested answer.'
+)
+
+# Section heading keywords (lowercase stems)
+SECTION_KEYWORDS = {
+    "summary": ["summary", "overview", "abstract", "резюме", "обзор", "краткое содержание", "аннотац"],
+    "key_points": [
+        "finding", "discover", "insight", "key point", "highlight", "additional",
+        "находк", "открыти", "инсайт", "ключев", "вывод", "дополнительн",
+    ],
+    "methodology": ["methodolog", "method", "approach", "методолог", "метод"],
+    "applications": ["application", "применени", "использовани"],
+}
+LIST_SECTIONS = {"key_points", "applications"}
+
+_NUMBERED_RE = re.compile(r"^\(?(\d{1,2})[.)]\s*")
+_BULLET_RE = re.compile(r"^[-*•–]\s+")
+_MARKDOWN_RE = re.compile(r"^#{1,6}\s*")
+_EMPHASIS_RE = re.compile(r"\*\*|__")
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_JSON_STRING_FIELD_RE = re.compile(r'"(summary|methodology)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_JSON_LIST_FIELD_RE = re.compile(r'"(key_points|applications)"\s*:\s*\[((?:[^\]"]|"(?:[^"\\]|\\.)*")*)')
+_JSON_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+# Process-wide counters, reported by /metrics
+parse_stats = {"json": 0, "json_partial": 0, "text": 0, "failed": 0}
+
+
+def _section_for(title: str) -> Optional[str]:
+    title = title.lower()
+    for section, keywords in SECTION_KEYWORDS.items():
+        if any(keyword in title for keyword in keywords):
+            return section
+    return None
+
+
+def _clean_item(text: str) -> str:
+    text = _BULLET_RE.sub("", text)
+    text = _NUMBERED_RE.sub("", text)
+    return _EMPHASIS_RE.sub("", text).strip()
+
+
+def _json_string(value: str) -> Optional[str]:
+    """Decode the body of a JSON string literal; None if it is malformed"""
+    try:
+        # strict=False: models often put literal newlines inside strings
+        return json.loads(f'"{value}"', strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if isinstance(value, str) and value.strip():
+        return [value.strip()]
+    return []
+
+
+class AnalysisStreamParser:
+    """Incremental parser; feed() chunks as they stream in, close() at the end"""
+
+    def __init__(self):
+        self.text = ""
+        self._pending = ""
+        self._section: Optional[str] = None
+        self._json_mode: Optional[bool] = None
+        self._heading_number: Optional[int] = None
+        self.fields: Dict[str, object] = {
+            "summary": "",
+            "key_points": [],
+            "methodology": "",
+            "applications": [],
+        }
+
+    def feed(self, chunk: str) -> Dict[str, object]:
+        """Consume a chunk and return the fields parsed so far"""
+        self.text += chunk
+        if self._json_mode is None and self.text.strip():
+            self._json_mode = self.text.lstrip().startswith(("{", "```"))
+
+        if self._json_mode:
+            # Completed string fields can be shown before the object closes
+            for name, value in _JSON_STRING_FIELD_RE.findall(self.text):
+                decoded = _json_string(value)
+                if decoded is not None:
+                    self.fields[name] = decoded
+            return self.fields
+
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._parse_line(line)
+        return self.fields
+
+    def _parse_line(self, raw_line: str):
+        line = raw_line.strip()
+        if not line:
+            return
+
+        is_markdown_heading = bool(_MARKDOWN_RE.match(line))
+        stripped = _MARKDOWN_RE.sub("", line)
+        plain = _EMPHASIS_RE.sub("", stripped).strip()
+        # Numbering is read through emphasis: "**3. Methods**" is numbered too
+        numbered = _NUMBERED_RE.match(plain)
+        is_numbered = bool(numbered)
+        title = _NUMBERED_RE.sub("", plain).strip()
+
+        # "Summary: text" / "**Резюме:** текст" - heading with inline content
+        head, sep, rest = title.partition(":")
+        candidate = head if sep else title
+        short = len(candidate.split()) <= 6
+        section = _section_for(candidate) if short else None
+        looks_like_heading = (
+            is_markdown_heading
+            or stripped.startswith(("**", "__"))
+            or bool(sep)
+            or is_numbered
+        )
+        # Inside its own section only a markdown or bare "Heading:" line restarts it,
+        # so an item like "2. Discovered water ice" stays content
+        repeats_section = (
+            section == self._section
+            and not is_markdown_heading
+            and not (sep and not rest.strip())
+        )
+        # ...or a bold heading continues the numbering of the previous ones ("2." -> "**3. ...**");
+        # a plain "3. Discovered ..." after items 1 and 2 is still an item
+        number = int(numbered.group(1)) if numbered else None
+        heading_shaped = (
+            is_markdown_heading
+            or stripped.startswith(("**", "__"))
+            or (sep and not rest.strip())
+        )
+        if (
+            heading_shaped
+            and number is not None
+            and self._heading_number is not None
+            and number == self._heading_number + 1
+        ):
+            repeats_section = False
+
+        if section and looks_like_heading and not repeats_section:
+            self._section = section
+            self._heading_number = number
+            if sep and rest.strip():
+                self._add_content(rest.strip(), is_item=False)
+            return
+
+        if is_markdown_heading:
+            # Unknown heading ends the current section
+            self._section = None
+            return
+
+        is_item = is_numbered or bool(_BULLET_RE.match(stripped))
+        if self._section is None and not any(self.fields.values()):
+            # Leading paragraph without a heading is the summary
+            self._section = "summary"
+        self._add_content(_clean_item(stripped), is_item=is_item)
+
+    def _add_content(self, text: str, is_item: bool):
+        if not text or self._section is None:
+            return
+        if self._section in LIST_SECTIONS:
+            self.fields[self._section].append(text)
+        elif self._section == "summary" and is_item and self.fields["summary"]:
+            # A list right after the summary paragraph is usually key points
+            self._section = "key_points"
+            self.fields["key_points"].append(text)
+        else:
+            separator = " " if self.fields[self._section] else ""
+            self.fields[self._section] += separator + text
+
+    def _parse_json(self) -> Optional[Dict[str, object]]:
+        body = _FENCE_RE.sub("", self.text.strip())
+        start, end = body.find("{"), body.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(body[start:end + 1], strict=False)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        return {
+            "summary": str(data.get("summary") or "").strip(),
+            "key_points": _as_list(data.get("key_points") or data.get("findings")),
+            "methodology": str(data.get("methodology") or "").strip(),
+            "applications": _as_list(data.get("applications")),
+        }
+
+    def _salvage_json(self) -> Dict[str, object]:
+        """Completed fields of a truncated or malformed JSON object"""
+        fields = {"summary": "", "key_points": [], "methodology": "", "applications": []}
+        for name, value in _JSON_STRING_FIELD_RE.findall(self.text):
+            decoded = _json_string(value)
+            if decoded is not None:
+                fields[name] = decoded.strip()
+        for name, items in _JSON_LIST_FIELD_RE.findall(self.text):
+            decoded_items = (_json_string(item) for item in _JSON_STRING_RE.findall(items))
+            fields[name] = [item.strip() for item in decoded_items if item is not None and item.strip()]
+        return fields
+
+    def close(self) -> Dict[str, object]:
+        """Finish parsing; parse_status is one of json, json_partial, text, failed"""
+        if self._json_mode:
+            parsed = self._parse_json()
+            if parsed is not None:
+                parse_stats["json"] += 1
+                return {**parsed, "parse_status": "json"}
+
+            salvaged = self._salvage_json()
+            if any(salvaged.values()):
+                parse_stats["json_partial"] += 1
+                return {**salvaged, "parse_status": "json_partial"}
+
+            # Not JSON after all: run the text parser over the whole output
+            self._json_mode = False
+            self._section = None
+            for line in _FENCE_RE.sub("", self.text.strip()).split("\n"):
+                self._parse_line(line)
+        elif self._pending:
+            self._parse_line(self._pending)
+            self._pending = ""
+
+        if self.fields["summary"] or self.fields["key_points"]:
+            parse_stats["text"] += 1
+            return {**self.fields, "parse_status": "text"}
+
+        parse_stats["failed"] += 1
+        print(f"Analysis parse failed, raw output starts with: {self.text[:200]!r}")
+        return {**self.fields, "parse_status": "failed"}
+
+
+def parse_analysis(text: str) -> Dict[str, object]:
+    """Parse a complete model response"""
+    parser = AnalysisStreamParser()
+    parser.feed(text)
+    return parser.close()
@@ -0,0 +1,125 @@
+"""
+Content previews computed once at upload time and stored in the catalog.
+
+- text: first PREVIEW_LINES lines
+- CSV/TSV: header plus PREVIEW_CSV_ROWS sample rows
+- PDF: first page text (PyPDF2, optional)
+- images: small base64 thumbnail (Pillow, optional)
+
+PDFs and images are opened from their local path when storage has one,
+so a large upload is never loaded into memory just for its preview.
+"""
+import base64
+import csv
+import io
+from pathlib import Path
+from typing import Optional, Union
+
+from app.core.config import settings
+
+CSV_TYPES = {"text/csv", "application/csv", "text/tab-separated-values"}
+TEXT_TYPES = {"application/json", "application/xml", "application/x-yaml"}
+
+
+def _kind(content_type: str, filename: str) -> Optional[str]:
+    name = (filename or "").lower()
+    if content_type in CSV_TYPES or name.endswith((".csv", ".tsv")):
+        return "csv"
+    if content_type.startswith("text/") or content_type in TEXT_TYPES:
+        return "text"
+    if content_type == "application/pdf" or name.endswith(".pdf"):
+        return "pdf"
+    if content_type.startswith("image/"):
+        return "image"
+    return None
+
+
+def preview_read_limit(content_type: str, filename: str) -> Optional[int]:
+    """How many leading bytes build_preview needs (None = whole file or a local path, 0 = nothing)"""
+    kind = _kind(content_type, filename)
+    if kind in ("text", "csv"):
+        return settings.PREVIEW_MAX_CHARS * 4  # worst case UTF-8 width
+    if kind in ("pdf", "image"):
+        return None
+    return 0
+
+
+def _decode(data: bytes) -> str:
+    # The head may end in the middle of a multi-byte character
+    return data.decode("utf-8", errors="ignore")
+
+
+def _text_preview(data: bytes) -> str:
+    lines = _decode(data).splitlines()[:settings.PREVIEW_LINES]
+    return "\n".join(lines)[:settings.PREVIEW_MAX_CHARS]
+
+
+def _csv_preview(data: bytes, filename: str) -> str:
+    text = _decode(data)
+    delimiter = "\t" if (filename or "").lower().endswith(".tsv") else ","
+    try:
+        delimiter = csv.Sniffer().sniff(text[:4096], delimiters=",;\t|").delimiter
+    except csv.Error:
+        pass
+
+    rows = []
+    for row in csv.reader(io.StringIO(text), delimiter=delimiter):
+        rows.append(delimiter.join(row))
+        if len(rows) > settings.PREVIEW_CSV_ROWS:  # header + sample rows
+            break
+    return "\n".join(rows)[:settings.PREVIEW_MAX_CHARS]
+
+
+def _open_binary(source: Union[bytes, Path]):
+    # A file object, not the path: PdfReader reads a whole file into memory when given a path
+    return source.open("rb") if isinstance(source, Path) else io.BytesIO(source)
+
+
+def _pdf_preview(source: Union[bytes, Path]) -> Optional[str]:
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        return None
+
+    with _open_binary(source) as f:
+        reader = PdfReader(f)
+        if not reader.pages:
+            return None
+        text = reader.pages[0].extract_text() or ""
+    return text.strip()[:settings.PREVIEW_MAX_CHARS] or None
+
+
+def _image_thumbnail(source: Union[bytes, Path]) -> Optional[str]:
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    with _open_binary(source) as f, Image.open(f) as image:
+        image.thumbnail((settings.THUMBNAIL_SIZE, settings.THUMBNAIL_SIZE))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=70)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def build_preview(data: Union[bytes, Path], content_type: str, filename: str) -> dict:
+    """Return {"content_preview": ..., "thumbnail": ...} for the file's leading bytes (or local path)"""
+    preview = {"content_preview": None, "thumbnail": None}
+    kind = _kind(content_type or "", filename)
+
+    try:
+        if kind == "csv":
+            preview["content_preview"] = _csv_preview(data, filename)
+        elif kind == "text":
+            preview["content_preview"] = _text_preview(data)
+        elif kind == "pdf":
+            preview["content_preview"] = _pdf_preview(data)
+        elif kind == "image":
+            preview["thumbnail"] = _image_thumbnail(data)
+    except Exception as e:
+        # A broken file must not fail the upload
+        print(f"Preview generation failed for {filename}: {e}")
+
+    return preview
@@ -0,0 +1,25 @@
+"""
+Space research themes used for automatic tagging.
+
+Keywords are lowercase substrings (English and Russian stems).
+"""
+from typing import Dict, List
+
+THEME_KEYWORDS: Dict[str, List[str]] = {
+    "exoplanets": ["exoplanet", "экзопланет", "kepler", "tess"],
+    "mars": ["mars", "martian", "perseverance", "curiosity", "марс"],
+    "lunar": ["lunar", "moon", "artemis", "луна", "лунн", "луны"],
+    "asteroids": ["asteroid", "bennu", "osiris-rex", "comet", "астероид", "комет"],
+    "stellar": ["stellar", "star formation", "james webb", "jwst", "звезд", "уэбб"],
+    "saturn": ["saturn", "cassini", "titan", "enceladus", "сатурн", "титан", "энцелад"],
+    "technology": ["propulsion", "ion engine", "life support", "autonomous navigation", "двигател", "технолог"],
+}
+
+
+def detect_themes(text: str) -> List[str]:
+    """Return the themes whose keywords occur in the text"""
+    text = (text or "").lower()
+    return [
+        theme for theme, keywords in THEME_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    ]
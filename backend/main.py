@@ -1,12 +1,41 @@
+import time
+
+_import_started_at = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.api import auth, files, chat, users
 from app.core.config import settings
+from app.core.startup import record_import_time, start_warm_up, startup_state, warm_up, within_import_budget
+from app.services.chat_store import chat_store
+from app.services.rate_limiter import llm_limiter, rate_limiter
+from app.services.single_flight import analysis_flight, chat_flight
+from app.services.intent_router import intent_router
+from app.utils.analysis_parser import parse_stats
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.LAZY_STARTUP:
+        # Serve /health immediately, warm caches in the background
+        warmup_task = start_warm_up()
+    else:
+        await warm_up()
+        warmup_task = None
+    # Keeps chat history memory bounded: archives old turns, spills idle users
+    compaction_task = chat_store.start_compaction()
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    compaction_task.cancel()
+    await chat_store.flush()
 
 app = FastAPI(
     title="NASA Space Apps AI Platform API",
     description="AI-powered file analysis platform for NASA Space Apps Challenge",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -36,6 +65,36 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished"""
+    body = {
+        "status": "ready" if startup_state["ready"] else "warming_up",
+        "import_time_ms": startup_state["import_time_ms"],
+        "import_budget_ms": settings.STARTUP_IMPORT_BUDGET_MS,
+        "within_import_budget": within_import_budget(),
+        "warmup_time_ms": startup_state["warmup_time_ms"],
+        "warmup_errors": startup_state["warmup_errors"]
+    }
+    return JSONResponse(status_code=200 if startup_state["ready"] else 503, content=body)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for rate limiting, LLM admission, coalescing, parsing, routing and chat history"""
+    return {
+        "rate_limits": rate_limiter.stats,
+        "llm_admission": llm_limiter.snapshot(),
+        "coalescing": {
+            "chat": chat_flight.snapshot(),
+            "analysis": analysis_flight.snapshot()
+        },
+        "analysis_parser": parse_stats,
+        "intent_routing": intent_router.stats,
+        "chat_history": chat_store.snapshot()
+    }
+
+record_import_time(_import_started_at)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
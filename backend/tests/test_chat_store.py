@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from app.services.chat_store import ChatStore
+
+
+def _store(tmp_path, max_users: int = 2) -> ChatStore:
+    return ChatStore(str(tmp_path), max_users=max_users, max_messages=100, keep_recent=10, idle_seconds=3600)
+
+
+def test_failed_spill_does_not_hang(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+
+    def disk_full(user_id, state):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_spill", disk_full)
+
+    async def scenario():
+        for user_id in ("u1", "u2", "u3"):
+            await asyncio.wait_for(store.add(user_id, "hi", "user"), 3)
+        await asyncio.wait_for(store.add("u9", "hi", "user"), 3)
+
+    asyncio.run(scenario())
+    # Nothing could be spilled, so every history stays in memory over the cap
+    assert len(store._users) == 4
+    assert store.stats["evictions"] == 0
+    assert store.stats["eviction_failures"] > 0
+
+
+def test_least_recent_user_is_evicted(tmp_path):
+    store = _store(tmp_path)
+
+    async def scenario():
+        for user_id in ("u1", "u2", "u3"):
+            await store.add(user_id, "hi", "user")
+        return await store.get("u1")
+
+    history = asyncio.run(scenario())
+    assert store.stats["evictions"] >= 1
+    assert store.stats["reloads"] == 1
+    assert [message["content"] for message in history] == ["hi"]
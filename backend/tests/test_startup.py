@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter so modules imported by other tests don't count
+IMPORT_MAIN = """
+import json, sys
+import main
+from app.core.config import settings
+from app.core.startup import startup_state
+print(json.dumps({
+    "import_time_ms": startup_state["import_time_ms"],
+    "budget_ms": settings.STARTUP_IMPORT_BUDGET_MS,
+    "heavy_modules": sorted(
+        name for name in ("openai", "jose", "passlib") if name in sys.modules
+    ),
+}))
+"""
+
+
+def _import_main() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_MAIN],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_time_within_budget():
+    state = _import_main()
+    assert state["import_time_ms"] is not None
+    assert state["import_time_ms"] <= state["budget_ms"]
+
+
+def test_heavy_modules_not_imported_at_startup():
+    state = _import_main()
+    assert state["heavy_modules"] == []